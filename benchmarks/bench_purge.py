@@ -0,0 +1,134 @@
+"""
+Бенчмарк зачистки на синтетическом аккаунте (без сети и настоящего аккаунта):
+
+    python -m benchmarks.bench_purge --dialogs 500 --messages 1000 --latency-ms 20
+    python -m benchmarks.bench_purge --scenario scan --targets 10 --flood-every 300
+    python -m benchmarks.bench_purge --scenario blacklist --repeat 0.1
+
+Печатает для каждого сценария время, сообщения/сек, число RPC по методам,
+число FloodWait и пиковую память.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+# config_manager требует переменные окружения; для бенчмарка подходят любые
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'benchmark')
+os.environ.setdefault('SESSION', 'benchmark')
+
+from modules import checkpoints, dialog_snapshot, entity_cache, membership_index, rate_limiter  # noqa: E402
+from modules.config_manager import set_config_overrides  # noqa: E402
+from modules.log_manager import setup_logging  # noqa: E402
+from modules.message_handler import purge_own_messages_everywhere, purge_users_everywhere  # noqa: E402
+from modules.modes import initial_presence_scan  # noqa: E402
+
+from .fake_telegram import add_activity, make_account  # noqa: E402
+
+SCENARIOS = ('blacklist', 'self', 'scan')
+
+
+def fresh_state(workdir: str, scenario: str):
+    """Отдельная база состояния на сценарий и сброс общих на процесс объектов."""
+    set_config_overrides(STATE_DB=os.path.join(workdir, f"{scenario}.db"),
+                         LISTS_DB=os.path.join(workdir, "lists.db"))
+    rate_limiter._rate_limiters.clear()
+    checkpoints._checkpoint_store = None
+    dialog_snapshot._dialog_snapshot = None
+    entity_cache._entity_cache = None
+    membership_index._membership_indexes.clear()
+
+
+async def run_scenario(scenario: str, args, client) -> dict:
+    client.reset_counters()
+    client.latency = args.latency_ms / 1000
+    client.flood_every = args.flood_every
+    client.flood_seconds = args.flood_seconds
+    targets = {user_id: f"u{user_id}" for user_id in range(2, args.targets + 2)}
+    me_id = client.me.id
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if scenario == 'blacklist':
+        await purge_users_everywhere(client, targets)
+    elif scenario == 'self':
+        await purge_own_messages_everywhere(client, me_id, {})
+    else:
+        await initial_presence_scan(client, targets)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'scenario': scenario,
+        'elapsed': elapsed,
+        'deleted': client.deleted_count,
+        'rate': client.deleted_count / elapsed if elapsed else 0.0,
+        'rpc': sum(client.rpc_counts.values()),
+        'rpc_counts': dict(client.rpc_counts),
+        'floods': client.flood_count,
+        'peak_mb': peak / 2 ** 20,
+    }
+
+
+def print_report(result: dict):
+    print(f"[{result['scenario']}] время {result['elapsed']:.2f} с, удалено {result['deleted']} "
+          f"({result['rate']:.0f} сообщ./с), RPC {result['rpc']}, FloodWait {result['floods']}, "
+          f"пик памяти {result['peak_mb']:.1f} МБ")
+    for method, count in sorted(result['rpc_counts'].items(), key=lambda item: -item[1]):
+        print(f"    {method:<20} {count}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк зачистки TG-Guard на синтетическом аккаунте")
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--dialogs', type=int, default=200, help="число диалогов")
+    parser.add_argument('--messages', type=int, default=500, help="сообщений в каждом диалоге")
+    parser.add_argument('--users', type=int, default=50, help="число людей, пишущих в диалогах")
+    parser.add_argument('--admin-share', type=float, default=0.0,
+                        help="доля супергрупп, где аккаунт — админ (серверное удаление истории)")
+    parser.add_argument('--targets', type=int, default=5, help="сколько из них в BLACKLIST/TRACKED")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="задержка одного RPC")
+    parser.add_argument('--flood-every', type=int, default=0, help="FloodWait на каждый N-й RPC (0 — выкл.)")
+    parser.add_argument('--flood-seconds', type=int, default=0,
+                        help="длительность FloodWait (лимитер добавляет ещё 1 с)")
+    parser.add_argument('--rate', type=float, default=1e6, help="темп лимитера, запр/с (по умолчанию без ограничения)")
+    parser.add_argument('--concurrency', type=int, default=4, help="PURGE_CONCURRENCY")
+    parser.add_argument('--no-plan', action='store_true', help="без предварительного подсчёта (PURGE_PLAN = False)")
+    parser.add_argument('--repeat', type=float, metavar='SHARE',
+                        help="повторить сценарий на том же аккаунте после новых сообщений в доле SHARE диалогов")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="не скрывать лог зачистки")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    set_config_overrides(
+        RATE_LIMIT_INITIAL=args.rate, RATE_LIMIT_MAX=max(args.rate, 1.0), RATE_LIMIT_BURST=max(int(args.rate), 1),
+        PURGE_CONCURRENCY=args.concurrency, PURGE_PLAN=not args.no_plan, DELETE_SAVED_MESSAGES=False,
+    )
+    # Лог зачистки пишется только с --verbose
+    setup_logging(logging.DEBUG if args.verbose else logging.CRITICAL)
+    scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    print(f"Аккаунт: {args.dialogs} диалогов × {args.messages} сообщ., людей {args.users}, целей {args.targets}, "
+          f"RPC {args.latency_ms} мс, параллельно {args.concurrency}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for scenario in scenarios:
+            fresh_state(workdir, scenario)
+            client = make_account(args.dialogs, args.messages, args.users, seed=args.seed, admin_share=args.admin_share)
+            print_report(await run_scenario(scenario, args, client))
+            if args.repeat is not None:
+                # Повторный запуск с тем же состоянием: работает снимок диалогов и индекс участников
+                add_activity(client, args.repeat, seed=args.seed + 1)
+                result = await run_scenario(scenario, args, client)
+                result['scenario'] += " (повтор)"
+                print_report(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
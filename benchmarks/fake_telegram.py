@@ -0,0 +1,275 @@
+import asyncio
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from telethon import errors
+from telethon.tl.types import Channel, Chat, ChatAdminRights, ChatPhotoEmpty, User
+from telethon.tl.types.messages import AffectedHistory
+from telethon.utils import get_peer_id
+
+# Размеры страниц, которыми отвечает настоящий сервер
+MESSAGES_PAGE = 100
+DIALOGS_PAGE = 100
+PARTICIPANTS_PAGE = 200
+# Столько сообщений сервер удаляет за один DeleteParticipantHistory (дальше — offset > 0)
+PARTICIPANT_HISTORY_BATCH = 1000
+
+
+class FakeMessage:
+    __slots__ = ('id', 'sender_id', 'raw_text')
+
+    def __init__(self, id: int, sender_id: int, raw_text: str = ""):
+        self.id = id
+        self.sender_id = sender_id
+        self.raw_text = raw_text
+
+
+class FakeDialog:
+    """Диалог синтетического аккаунта: сущность, история и участники."""
+
+    def __init__(self, entity, name: str, members: List[int]):
+        self.entity = entity
+        self.name = name
+        self.id = get_peer_id(entity)
+        self.members = members
+        self.messages: List[FakeMessage] = []  # По возрастанию ID
+        self.deleted: Set[int] = set()
+
+    @property
+    def message(self) -> Optional[FakeMessage]:
+        return self.messages[-1] if self.messages else None
+
+
+class _Total(list):
+    total = 0
+
+
+class FakeIter:
+    """
+    Постраничный итератор, как RequestIter в Telethon: страница запрашивается
+    отдельным «RPC», а после FloodWaitError итерацию можно продолжить.
+    """
+
+    def __init__(self, client: 'FakeTelegramClient', method: str, items: List, page_size: int):
+        self.client = client
+        self.method = method
+        self.items = items
+        self.page_size = page_size
+        self.offset = 0
+        self.buffer: List = []
+        self.fetched = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.buffer:
+            # Даже пустой ответ стоит одного запроса
+            if self.fetched and self.offset >= len(self.items):
+                raise StopAsyncIteration
+            await self.client._rpc(self.method)
+            self.fetched = True
+            self.buffer = self.items[self.offset:self.offset + self.page_size]
+            self.offset += self.page_size
+            if not self.buffer:
+                raise StopAsyncIteration
+        return self.buffer.pop(0)
+
+
+class _Session:
+    def process_entities(self, entities):
+        pass
+
+
+class FakeTelegramClient:
+    """
+    Заменитель TelegramClient в памяти процесса для бенчмарков: та часть API,
+    которой пользуется TG-Guard. Каждый «запрос» к серверу стоит `latency`
+    секунд и учитывается в `rpc_counts`; каждый `flood_every`-й запрос
+    завершается FloodWaitError на `flood_seconds` секунд.
+    """
+
+    def __init__(self, me: User, dialogs: List[FakeDialog], latency: float = 0.0,
+                 flood_every: int = 0, flood_seconds: int = 0):
+        self.me = me
+        self.dialogs = dialogs
+        self.latency = latency
+        self.flood_every = flood_every
+        self.flood_seconds = flood_seconds
+        self.rpc_counts: Counter = Counter()
+        self.flood_count = 0
+        self.deleted_count = 0
+        self.sent: List[str] = []
+        self.session = _Session()
+        self._rpc_total = 0
+        self._by_id: Dict[int, FakeDialog] = {}
+        for dialog in dialogs:
+            self._by_id[dialog.id] = dialog
+            self._by_id[dialog.entity.id] = dialog
+
+    async def _rpc(self, method: str):
+        self._rpc_total += 1
+        if self.flood_every and self._rpc_total % self.flood_every == 0:
+            self.flood_count += 1
+            raise errors.FloodWaitError(request=None, capture=self.flood_seconds)
+        self.rpc_counts[method] += 1
+        await asyncio.sleep(self.latency)
+
+    def _dialog(self, entity) -> Optional[FakeDialog]:
+        if entity in ("me", "self"):
+            return self._by_id.get(self.me.id)
+        return self._by_id.get(getattr(entity, 'id', entity))
+
+    # --- Методы TelegramClient ---
+
+    async def get_me(self):
+        await self._rpc("GetUsers")
+        return self.me
+
+    async def get_entity(self, entity):
+        await self._rpc("ResolveUsername" if isinstance(entity, str) else "GetUsers")
+        if isinstance(entity, str):
+            entity = int(entity.lstrip('@').lstrip('u'))
+        return _user(entity)
+
+    async def get_input_entity(self, peer):
+        """Как в Telethon: только из кэша сессии (без RPC), неизвестный peer — ValueError."""
+        dialog = self._dialog(peer)
+        if dialog is None:
+            raise ValueError(f"Could not find the input entity for {peer}")
+        return dialog.entity
+
+    def iter_dialogs(self, **kwargs):
+        return FakeIter(self, "GetDialogs", list(self.dialogs), DIALOGS_PAGE)
+
+    def iter_messages(self, entity, from_user=None, min_id: int = 0, reverse: bool = False, **kwargs):
+        dialog = self._dialog(entity)
+        sender_id = getattr(from_user, 'id', from_user)
+        messages = [
+            m for m in (dialog.messages if dialog else [])
+            if m.id > min_id and m.id not in dialog.deleted and (sender_id is None or m.sender_id == sender_id)
+        ]
+        if not reverse:
+            messages.reverse()
+        return FakeIter(self, "Search" if sender_id is not None else "GetHistory", messages, MESSAGES_PAGE)
+
+    async def get_messages(self, entity, limit=None, **kwargs):
+        """Только режим подсчёта (limit=0): один запрос, отдаётся лишь total."""
+        messages = self.iter_messages(entity, **kwargs).items
+        await self._rpc("Search" if kwargs.get('from_user') is not None else "GetHistory")
+        result = _Total(messages[:limit])
+        result.total = len(messages)
+        return result
+
+    async def delete_messages(self, entity, message_ids, revoke: bool = True):
+        await self._rpc("DeleteMessages")
+        ids = [message_ids] if isinstance(message_ids, int) else list(message_ids)
+        dialog = self._dialog(entity)
+        if dialog is not None:
+            dialog.deleted.update(ids)
+        self.deleted_count += len(ids)
+
+    async def send_message(self, entity, message, parse_mode=None, **kwargs):
+        await self._rpc("SendMessage")
+        self.sent.append(message)
+        return FakeMessage(10 ** 9 + len(self.sent), self.me.id, message)
+
+    async def get_participants(self, entity, limit=None, **kwargs):
+        await self._rpc("GetParticipants" if isinstance(entity, Channel) else "GetFullChat")
+        members = self._dialog(entity).members
+        result = _Total(_user(m) for m in members[:limit])
+        result.total = len(members)
+        return result
+
+    def iter_participants(self, entity, **kwargs):
+        members = [_user(m) for m in self._dialog(entity).members]
+        return FakeIter(self, "GetParticipants", members, PARTICIPANTS_PAGE)
+
+    async def __call__(self, request):
+        method = type(request).__name__[:-len("Request")]
+        await self._rpc(method)
+        if method == "GetParticipant":
+            if request.participant not in self._dialog(request.channel).members:
+                raise errors.UserNotParticipantError(request)
+            return True
+        if method == "DeleteParticipantHistory":
+            dialog = self._dialog(request.channel)
+            if not getattr(dialog.entity, 'admin_rights', None):
+                raise errors.ChatAdminRequiredError(request)
+            user_id = getattr(request.participant, 'user_id', request.participant)
+            ids = [m.id for m in dialog.messages if m.sender_id == user_id and m.id not in dialog.deleted]
+            batch = ids[:PARTICIPANT_HISTORY_BATCH]
+            dialog.deleted.update(batch)
+            self.deleted_count += len(batch)
+            return AffectedHistory(pts=0, pts_count=len(batch), offset=1 if len(ids) > len(batch) else 0)
+        raise NotImplementedError(method)
+
+    def reset_counters(self):
+        self.rpc_counts.clear()
+        self.flood_count = 0
+        self.deleted_count = 0
+
+    def on(self, event):
+        return lambda handler: handler
+
+    def add_event_handler(self, handler, event=None):
+        pass
+
+
+def _user(user_id: int) -> User:
+    return User(id=user_id, access_hash=user_id * 7919, first_name=f"u{user_id}")
+
+
+def make_account(dialogs: int = 200, messages: int = 500, users: int = 50, group_share: float = 0.6,
+                 supergroup_size: int = 2000, me_id: int = 1, seed: int = 1,
+                 admin_share: float = 0.0) -> FakeTelegramClient:
+    """
+    Синтетический аккаунт: `dialogs` диалогов (доля `group_share` — группы, из них
+    половина — супергруппы), по `messages` сообщений в каждом. Сообщения в группах
+    пишут пользователи 2..users+1 и сам владелец (me_id), в ЛС — собеседник и владелец.
+    В доле `admin_share` супергрупп владелец — админ с правом удалять сообщения.
+    """
+    rng = random.Random(seed)
+    me = User(id=me_id, access_hash=1, first_name="me", is_self=True)
+    people = list(range(2, users + 2))
+    result: List[FakeDialog] = [FakeDialog(me, "Saved Messages", [me_id])]
+
+    free_peers = list(people)
+    rng.shuffle(free_peers)
+    for i in range(dialogs):
+        # ЛС с каждым человеком не больше одного; когда собеседники кончились — только группы
+        if rng.random() < group_share or not free_peers:
+            if i % 2:
+                size = rng.randint(supergroup_size // 10, supergroup_size)
+                rights = ChatAdminRights(delete_messages=True) if rng.random() < admin_share else None
+                entity = Channel(id=10 ** 6 + i, title=f"sg{i}", photo=ChatPhotoEmpty(), date=None,
+                                 megagroup=True, access_hash=i, admin_rights=rights)
+                members = [me_id] + rng.sample(people, min(len(people), 30)) + list(range(10 ** 7, 10 ** 7 + size))
+            else:
+                entity = Chat(id=10 ** 5 + i, title=f"c{i}", photo=ChatPhotoEmpty(), participants_count=20,
+                              date=None, version=1)
+                members = [me_id] + rng.sample(people, min(len(people), 20))
+            senders = [m for m in members if m < 10 ** 7]
+            dialog = FakeDialog(entity, entity.title, members)
+        else:
+            peer = free_peers.pop()
+            dialog = FakeDialog(_user(peer), f"u{peer}", [me_id, peer])
+            senders = [me_id, peer]
+        for msg_id, sender in enumerate(rng.choices(senders, k=messages), start=1):
+            dialog.messages.append(FakeMessage(msg_id, sender))
+        result.append(dialog)
+
+    return FakeTelegramClient(me, result)
+
+
+def add_activity(client: FakeTelegramClient, share: float = 0.1, messages: int = 20, seed: int = 2):
+    """Новые сообщения в доле `share` диалогов — как между двумя запусками зачистки."""
+    rng = random.Random(seed)
+    for dialog in client.dialogs:
+        if rng.random() >= share:
+            continue
+        senders = sorted({m.sender_id for m in dialog.messages}) or [client.me.id]
+        next_id = dialog.messages[-1].id + 1 if dialog.messages else 1
+        for msg_id, sender in enumerate(rng.choices(senders, k=messages), start=next_id):
+            dialog.messages.append(FakeMessage(msg_id, sender))
@@ -1,3 +1,6 @@
+# Начальные списки: при первом запуске переносятся в хранилище LISTS_DB,
+# дальше редактируются через меню или `python -m modules.list_store`
+
 # Список пользователей для отслеживания (юзернеймы с @ или без)
 TRACKED = ['']
 
@@ -13,14 +16,62 @@ EXPORT_GROUP = ""
 # Настройки автоудаления сообщений в 'Избранном'
 DELETE_SAVED_DELAY_SECONDS = 30  # Задержка перед удалением (в секундах)
 DELETE_SAVED_MESSAGES = True     # Включить автоудаление сообщений в 'Избранном'
+ALERT_DIGEST_SECONDS = 10        # Находки сканирования копятся и уходят в 'Избранное' сводкой не чаще раза в столько секунд
+AUTO_DELETE_SLOT_SECONDS = 2     # Сообщения, чей срок выпал на один слот, удаляются одним запросом
 
 # Настройки массового удаления
 DELETE_CHUNK = 100       # Максимум сообщений за один запрос
-DELETE_PAUSE = 0.6       # Пауза между пачками (в секундах)
+PURGE_CONCURRENCY = 4    # Сколько диалогов зачищается параллельно
+PURGE_PLAN = True        # Перед зачисткой считать сообщения (limit=0) и чистить от мелких диалогов к крупным
+PURGE_INCREMENTAL = True # Повторная зачистка проходит только диалоги с новыми сообщениями (выше прошлой отметки)
+PURGE_ADMIN_FAST_PATH = True  # В супергруппах, где мы админ, удалять историю пользователя целиком на сервере
+PLAN_FILE_OUT = ""        # Режимы 2 и 5: только найти сообщения и записать план в этот файл (ничего не удаляя)
+PLAN_FILE_IN = ""         # Режимы 2 и 5: удалить сообщения по ранее записанному плану
+PLAN_FILE_LIMIT = 0       # Сколько сообщений плана удалять за запуск (0 — весь план); следующий запуск продолжит
+LIVE_DELETE_WINDOW_MS = 150  # Окно сбора живых удалений в пачку при флуде (мс)
+STATE_DB = "tg_guard_state.db"  # Локальная база состояния (контрольные точки, кэш пользователей)
+LISTS_DB = "tg_guard_lists.db"  # Хранилище списков TRACKED/BLACKLIST/EXCLUSION
+
+# Горячая перезагрузка списков (также по сигналу SIGHUP)
+LIST_RELOAD_POLL_SECONDS = 5  # Как часто проверять изменение хранилища списков (0 — только SIGHUP)
+
+# Кэш резолва юзернеймов
+ENTITY_CACHE_TTL = 7 * 24 * 3600  # Сколько секунд запись в кэше считается свежей
+RESOLVE_CONCURRENCY = 4           # Сколько юзернеймов резолвится одновременно
+
+# Адаптивный лимит запросов к API (запросов в секунду): снижается на FloodWait, затем плавно растёт
+RATE_LIMIT_INITIAL = 3.0  # Стартовый темп
+RATE_LIMIT_MIN = 0.5      # Нижняя граница после FloodWait
+RATE_LIMIT_MAX = 20.0     # Верхняя граница при разгоне
+RATE_LIMIT_BURST = 5      # Сколько запросов можно отправить подряд без ожидания
+RATE_LIMIT_LIVE_STREAK = 8  # Живые удаления идут вне очереди, но после стольких подряд — один фоновый запрос
+SIGN_IN_FLOOD_SLEEP = 60    # Вход и get_me идут мимо лимитера: FloodWait до стольких секунд Telethon пережидает сам
+
+# Выбор стратегии проверки присутствия в супергруппах (по стоимости в RPC)
+PRESENCE_LOOKUP_MAX = 3        # До стольких отслеживаемых — всегда точечные запросы GetParticipant
+PRESENCE_LISTING_MAX = 10000   # Больше участников Telegram не отдаёт выгрузкой — только точечно
+PRESENCE_LISTING_COST = 1.0    # Во сколько точечных запросов обходится одна страница выгрузки
+
+# Индекс участников (чат → отслеживаемые), хранится в STATE_DB
+MEMBERSHIP_SNAPSHOT_SECONDS = 60       # Как часто сохранять снимок индекса на диск
+MEMBERSHIP_REVERIFY_SECONDS = 24 * 3600  # Через сколько секунд перепроверять даже неизменившийся чат
+
+# Метрики (формат Prometheus): HTTP на 127.0.0.1:METRICS_PORT и/или файл для textfile-коллектора
+METRICS_PORT = 0               # 0 — HTTP выключен
+METRICS_FILE = ""              # Пустая строка — файл не пишется
+METRICS_FILE_SECONDS = 15      # Как часто переписывать файл метрик
+
+# Запуск без меню (python main.py --headless), например под systemd; флаги командной строки важнее
+HEADLESS_MODE = 3  # 1 — сканирование, 2 — полная зачистка BLACKLIST, 3 — только новые, 4 — комбинированный, 5 — самоочистка
+
+# Устаревшая настройка (паузу между пачками теперь подбирает адаптивный лимит RATE_LIMIT_*)
+DELETE_PAUSE = 0.6
 
 # Устаревшая настройка (теперь управляется через меню)
 ON_START_PURGE = True    # Используется только в комбинированном режиме
 
 # Дополнительные настройки для новых режимов
-ENABLE_LOGGING = True    # Включить подробное логирование действий
+ENABLE_LOGGING = True    # Подробный лог (уровень DEBUG): каждый диалог и каждое удалённое сообщение
 SHOW_DELETION_NOTIFICATIONS = True  # Показывать уведомления об удалении сообщений
+LOG_FORMAT = "text"      # "text" — как в терминале, "json" — по строке JSON на запись (для journald/сборщиков логов)
+LOG_PROGRESS_SECONDS = 5 # Как часто писать строку прогресса длинной зачистки
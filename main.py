@@ -1,12 +1,88 @@
-
+import argparse
 import asyncio
+from modules.config_manager import get_config, set_config_overrides
+from modules.log_manager import setup_logging
 from modules.telegram_client import run_telegram_client
 
+# Имена режимов для --mode (можно указывать и номер)
+MODE_NAMES = {'scan': 1, 'purge': 2, 'new': 3, 'combined': 4, 'self': 5}
+
+
+def parse_mode(value: str) -> int:
+    if value in MODE_NAMES:
+        return MODE_NAMES[value]
+    if value in ('1', '2', '3', '4', '5'):
+        return int(value)
+    raise argparse.ArgumentTypeError(f"неизвестный режим '{value}': 1-5 или {', '.join(MODE_NAMES)}")
+
+
+def parse_list(value: str):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TG-Guard")
+    parser.add_argument('--headless', action='store_true',
+                        help="запуск без меню (для systemd и автоперезапуска)")
+    parser.add_argument('--mode', type=parse_mode,
+                        help="режим: 1/scan, 2/purge, 3/new, 4/combined, 5/self (по умолчанию HEADLESS_MODE)")
+    parser.add_argument('--tracked', type=parse_list, help="TRACKED через запятую (вместо сохранённого)")
+    parser.add_argument('--blacklist', type=parse_list, help="BLACKLIST через запятую (вместо сохранённого)")
+    parser.add_argument('--exclusion', type=parse_list, help="EXCLUSION через запятую (вместо сохранённого)")
+    parser.add_argument('--export-group', help="группа для экспорта участников (EXPORT_GROUP)")
+    parser.add_argument('--rate', type=float, help="стартовый темп запросов в секунду (RATE_LIMIT_INITIAL)")
+    parser.add_argument('--concurrency', type=int, help="сколько диалогов зачищать параллельно (PURGE_CONCURRENCY)")
+    parser.add_argument('--metrics-port', type=int, help="порт HTTP с метриками Prometheus (METRICS_PORT)")
+    parser.add_argument('--metrics-file', help="файл, куда периодически пишутся метрики (METRICS_FILE)")
+    parser.add_argument('--full-scan', action='store_true',
+                        help="пройти историю целиком, без пропуска неизменившихся диалогов (PURGE_INCREMENTAL)")
+    plan = parser.add_mutually_exclusive_group()
+    plan.add_argument('--plan-out', metavar='FILE',
+                      help="режимы 2 и 5: только записать план зачистки в файл, ничего не удаляя (PLAN_FILE_OUT)")
+    plan.add_argument('--plan-in', metavar='FILE',
+                      help="режимы 2 и 5: удалить сообщения по записанному плану (PLAN_FILE_IN)")
+    parser.add_argument('--plan-limit', type=int, metavar='N',
+                        help="удалить не больше N сообщений плана за запуск (PLAN_FILE_LIMIT)")
+    parser.add_argument('--log-format', choices=('text', 'json'), help="формат лога (LOG_FORMAT)")
+    parser.add_argument('--yes', action='store_true', help="подтвердить самоочистку (режим 5) без вопроса")
+    return parser.parse_args()
+
 
 async def main():
     """Главная функция программы."""
+    args = parse_args()
+    set_config_overrides(
+        EXPORT_GROUP=args.export_group,
+        RATE_LIMIT_INITIAL=args.rate,
+        PURGE_CONCURRENCY=args.concurrency,
+        METRICS_PORT=args.metrics_port,
+        METRICS_FILE=args.metrics_file,
+        PURGE_INCREMENTAL=False if args.full_scan else None,
+        LOG_FORMAT=args.log_format,
+        PLAN_FILE_OUT=args.plan_out,
+        PLAN_FILE_IN=args.plan_in,
+        PLAN_FILE_LIMIT=args.plan_limit,
+    )
+    setup_logging()
+
+    lists_override = None
+    if args.headless:
+        config = get_config()
+        # Запись плана ничего не удаляет — подтверждение нужно только для самой зачистки
+        if (args.mode or config['HEADLESS_MODE']) == 5 and not args.yes and not config['PLAN_FILE_OUT']:
+            print("❌ Самоочистка без меню требует флага --yes")
+            raise SystemExit(2)
+        if args.tracked is not None or args.blacklist is not None or args.exclusion is not None:
+            from modules.list_store import load_lists
+            tracked, blacklist, exclusion = load_lists()
+            lists_override = (
+                tracked if args.tracked is None else args.tracked,
+                blacklist if args.blacklist is None else args.blacklist,
+                exclusion if args.exclusion is None else args.exclusion,
+            )
+
     try:
-        await run_telegram_client()
+        await run_telegram_client(headless=args.headless, mode=args.mode, lists_override=lists_override)
     except KeyboardInterrupt:
         print("\n\n👋 Программа завершена пользователем")
     except Exception as e:
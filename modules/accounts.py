@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from telethon import TelegramClient
+
+
+@dataclass
+class Account:
+    """Аккаунт, запущенный в этом процессе."""
+    client: TelegramClient
+    session: str
+    me_id: int
+    name: str
+
+
+_accounts: Dict[TelegramClient, Account] = {}
+
+
+def register_account(client: TelegramClient, session: str, me_id: int, name: str) -> Account:
+    """Запоминает, какому аккаунту принадлежит клиент (после входа)."""
+    account = Account(client, session, me_id, name)
+    _accounts[client] = account
+    return account
+
+
+def account_of(client: TelegramClient) -> Optional[Account]:
+    return _accounts.get(client)
+
+
+def account_id(client: TelegramClient) -> int:
+    """
+    ID владельца клиента. access_hash и прогресс зачистки у каждого аккаунта
+    свои, поэтому по этому ID разделяются кэши и контрольные точки.
+    Для незарегистрированного клиента (один аккаунт, бенчмарк) — 0.
+    """
+    account = _accounts.get(client)
+    return account.me_id if account else 0
+
+
+def account_label(client: TelegramClient) -> str:
+    """Метка аккаунта для логов и метрик."""
+    account = _accounts.get(client)
+    return account.session if account else "default"
+
+
+def all_accounts() -> List[Account]:
+    return list(_accounts.values())
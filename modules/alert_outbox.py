@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from telethon import TelegramClient
+
+from .config_manager import get_config
+from .message_handler import send_to_saved
+from .metrics import get_metrics
+
+log = logging.getLogger(__name__)
+
+# Предел длины одного сообщения Telegram (считаем по исходному тексту с разметкой — с запасом)
+MESSAGE_LIMIT = 4096
+DIGEST_TITLE = "ℹ️ **Сводка:**"
+
+
+class AlertOutbox:
+    """
+    Копит несрочные оповещения (находки сканирования присутствия) и отправляет
+    их в 'Избранное' сводками: строки склеиваются в сообщения до MESSAGE_LIMIT
+    символов. Сводка уходит через flush_seconds после первой строки, сразу —
+    когда набралось на целое сообщение, и по flush() в конце прохода.
+    Срочные оповещения (ALERT_PREFIX) сюда не попадают и отправляются сразу.
+    """
+
+    def __init__(self, client: TelegramClient, flush_seconds: float):
+        self.client = client
+        self.flush_seconds = flush_seconds
+        self._lines: List[str] = []
+        self._length = len(DIGEST_TITLE)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: Set[asyncio.Task] = set()
+
+    def add(self, line: str):
+        """Ставит строку в ближайшую сводку."""
+        line = line[:MESSAGE_LIMIT - len(DIGEST_TITLE) - 1]
+        if self._length + 1 + len(line) > MESSAGE_LIMIT:
+            # Строка уже не влезает — текущее сообщение набрано целиком
+            self._send_later(self._take())
+        self._lines.append(line)
+        self._length += 1 + len(line)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_seconds, lambda: self._send_later(self._take())
+            )
+
+    def pending(self) -> int:
+        """Сколько строк ждут отправки."""
+        return len(self._lines)
+
+    async def flush(self):
+        """Отправляет всё накопленное (несколько сообщений, если не влезает в одно)."""
+        await self._send(self._take())
+
+    def _take(self) -> List[str]:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        lines, self._lines = self._lines, []
+        self._length = len(DIGEST_TITLE)
+        return lines
+
+    def _send_later(self, lines: List[str]):
+        # Держим ссылку на задачу, пока сводка не отправлена
+        task = asyncio.create_task(self._send(lines))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, lines: List[str]):
+        for text in _pack(lines):
+            try:
+                await send_to_saved(self.client, text, keep=False)
+            except Exception as e:
+                log.warning(f"[ALERTS] ⚠️ Не удалось отправить сводку: {e}")
+                continue
+            get_metrics().inc('tg_guard_alert_digests_total')
+        if lines:
+            log.debug(f"[ALERTS] 📨 Отправлена сводка: {len(lines)} строк")
+
+
+def _pack(lines: List[str]) -> List[str]:
+    """Склеивает строки в сообщения не длиннее MESSAGE_LIMIT, каждое — с заголовком."""
+    messages: List[str] = []
+    current = [DIGEST_TITLE]
+    length = len(DIGEST_TITLE)
+    for line in lines:
+        if length + 1 + len(line) > MESSAGE_LIMIT:
+            messages.append("\n".join(current))
+            current = [DIGEST_TITLE]
+            length = len(DIGEST_TITLE)
+        current.append(line)
+        length += 1 + len(line)
+    if len(current) > 1:
+        messages.append("\n".join(current))
+    return messages
+
+
+_outboxes: Dict[TelegramClient, AlertOutbox] = {}
+
+
+def get_alert_outbox(client: TelegramClient) -> AlertOutbox:
+    """Очередь сводок оповещений для клиента (одна на клиента)."""
+    outbox = _outboxes.get(client)
+    if outbox is None:
+        outbox = AlertOutbox(client, get_config()['ALERT_DIGEST_SECONDS'])
+        _outboxes[client] = outbox
+        get_metrics().gauge('tg_guard_alert_outbox_pending', "Оповещения, ждущие отправки сводкой",
+                            lambda: sum(o.pending() for o in _outboxes.values()))
+    return outbox
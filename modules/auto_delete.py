@@ -0,0 +1,92 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+from telethon import TelegramClient
+
+from .config_manager import get_config
+from .metrics import get_metrics
+from .rate_limiter import get_rate_limiter
+
+log = logging.getLogger(__name__)
+
+
+class AutoDeleteWheel:
+    """
+    Колесо таймеров для автоудаления в 'Избранном'.
+    Время делится на слоты по `slot_seconds`; ID, срок которых наступает в
+    одном слоте, удаляются одним запросом (до `batch_size` штук). Вместо задачи
+    на каждое сообщение работает одна фоновая задача на всё колесо.
+    """
+
+    def __init__(self, client: TelegramClient, slot_seconds: float, batch_size: int):
+        self.client = client
+        self.slot_seconds = slot_seconds
+        self.batch_size = batch_size
+        self._slots: Dict[int, List[int]] = {}
+        self._heap: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def schedule(self, msg_id: int, delay: float):
+        """Ставит сообщение в слот, на который приходится момент удаления."""
+        slot = math.ceil((time.monotonic() + delay) / self.slot_seconds)
+        if slot not in self._slots:
+            self._slots[slot] = []
+            heapq.heappush(self._heap, slot)
+            if self._wakeup and self._heap[0] == slot:
+                # Новый слот раньше всех ожидающих — будим колесо
+                self._wakeup.set()
+        self._slots[slot].append(msg_id)
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def pending(self) -> int:
+        """Сколько сообщений ждут удаления."""
+        return sum(len(ids) for ids in self._slots.values())
+
+    async def _run(self):
+        while self._heap:
+            delay = self._heap[0] * self.slot_seconds - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            current = math.floor(time.monotonic() / self.slot_seconds)
+            due: List[int] = []
+            while self._heap and self._heap[0] <= current:
+                due.extend(self._slots.pop(heapq.heappop(self._heap)))
+            for i in range(0, len(due), self.batch_size):
+                await self._delete(due[i:i + self.batch_size])
+
+    async def _delete(self, ids: List[int]):
+        try:
+            await get_rate_limiter(self.client).call(lambda: self.client.delete_messages("me", ids, revoke=False))
+            get_metrics().inc('tg_guard_messages_deleted_total', len(ids), source="saved")
+            log.debug(f"[AUTO-DELETE] ✅ Удалены {len(ids)} сообщ. в 'Избранном'")
+        except Exception as e:
+            log.warning(f"[AUTO-DELETE] [WARN] Ошибка при удалении: {e}")
+
+
+_wheels: Dict[TelegramClient, AutoDeleteWheel] = {}
+
+
+def get_auto_delete_wheel(client: TelegramClient) -> AutoDeleteWheel:
+    """Колесо автоудаления для клиента (одно на клиента)."""
+    wheel = _wheels.get(client)
+    if wheel is None:
+        config = get_config()
+        wheel = AutoDeleteWheel(client, config['AUTO_DELETE_SLOT_SECONDS'], config['DELETE_CHUNK'])
+        _wheels[client] = wheel
+        get_metrics().gauge('tg_guard_auto_delete_pending', "Сообщения в 'Избранном', ждущие автоудаления",
+                            lambda: sum(w.pending() for w in _wheels.values()))
+    return wheel
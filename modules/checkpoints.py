@@ -0,0 +1,76 @@
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from .config_manager import get_config
+
+
+class CheckpointStore:
+    """
+    Локальное хранилище контрольных точек зачистки (SQLite).
+    Для каждой пары (задача, диалог) хранит наибольший уже обработанный ID
+    сообщения и признак того, что диалог пройден до конца.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS purge_checkpoints ("
+            " job TEXT NOT NULL,"
+            " dialog_id INTEGER NOT NULL,"
+            " boundary INTEGER NOT NULL DEFAULT 0,"
+            " done INTEGER NOT NULL DEFAULT 0,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (job, dialog_id))"
+        )
+        self.conn.commit()
+
+    def get(self, job: str, dialog_id: int) -> Tuple[int, bool]:
+        """Возвращает (граница, завершён ли диалог); для нового диалога — (0, False)."""
+        row = self.conn.execute(
+            "SELECT boundary, done FROM purge_checkpoints WHERE job = ? AND dialog_id = ?",
+            (job, dialog_id)
+        ).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def advance(self, job: str, dialog_id: int, boundary: int):
+        """Сдвигает границу обработанных сообщений вверх (назад не двигает)."""
+        self.conn.execute(
+            "INSERT INTO purge_checkpoints (job, dialog_id, boundary, done, updated) VALUES (?, ?, ?, 0, ?)"
+            " ON CONFLICT (job, dialog_id) DO UPDATE SET"
+            " boundary = MAX(boundary, excluded.boundary), updated = excluded.updated",
+            (job, dialog_id, boundary, time.time())
+        )
+        self.conn.commit()
+
+    def mark_done(self, job: str, dialog_id: int):
+        """Отмечает диалог как полностью обработанный."""
+        self.conn.execute(
+            "INSERT INTO purge_checkpoints (job, dialog_id, boundary, done, updated) VALUES (?, ?, 0, 1, ?)"
+            " ON CONFLICT (job, dialog_id) DO UPDATE SET done = 1, updated = excluded.updated",
+            (job, dialog_id, time.time())
+        )
+        self.conn.commit()
+
+    def done_count(self, job: str) -> int:
+        """Сколько диалогов задачи уже завершено."""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM purge_checkpoints WHERE job = ? AND done = 1", (job,)
+        ).fetchone()
+        return row[0]
+
+    def clear_job(self, job: str):
+        """Удаляет все контрольные точки задачи (после успешного завершения)."""
+        self.conn.execute("DELETE FROM purge_checkpoints WHERE job = ?", (job,))
+        self.conn.commit()
+
+
+_checkpoint_store: Optional[CheckpointStore] = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Общее на процесс хранилище контрольных точек."""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(get_config()['STATE_DB'])
+    return _checkpoint_store
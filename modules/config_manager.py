@@ -1,11 +1,18 @@
 import os
-import re
-from typing import List, Dict
+from typing import Any, Dict
 from dotenv import load_dotenv
 
 from config import (
     TRACKED, BLACKLIST, EXCLUSION_LIST, EXPORT_GROUP, DELETE_CHUNK, DELETE_PAUSE, ON_START_PURGE,
-    DELETE_SAVED_MESSAGES, DELETE_SAVED_DELAY_SECONDS
+    DELETE_SAVED_MESSAGES, DELETE_SAVED_DELAY_SECONDS, AUTO_DELETE_SLOT_SECONDS, ALERT_DIGEST_SECONDS,
+    PURGE_CONCURRENCY, PURGE_PLAN, PURGE_INCREMENTAL, PURGE_ADMIN_FAST_PATH,
+    PLAN_FILE_OUT, PLAN_FILE_IN, PLAN_FILE_LIMIT, LIVE_DELETE_WINDOW_MS, STATE_DB, LISTS_DB, ENTITY_CACHE_TTL,
+    RESOLVE_CONCURRENCY, LIST_RELOAD_POLL_SECONDS,
+    PRESENCE_LOOKUP_MAX, PRESENCE_LISTING_MAX, PRESENCE_LISTING_COST,
+    MEMBERSHIP_SNAPSHOT_SECONDS, MEMBERSHIP_REVERIFY_SECONDS, HEADLESS_MODE,
+    METRICS_PORT, METRICS_FILE, METRICS_FILE_SECONDS,
+    RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_BURST, RATE_LIMIT_LIVE_STREAK, SIGN_IN_FLOOD_SLEEP,
+    ENABLE_LOGGING, SHOW_DELETION_NOTIFICATIONS, LOG_FORMAT, LOG_PROGRESS_SECONDS
 )
 
 # --- ENV ---
@@ -13,6 +20,8 @@ load_dotenv()
 API_ID_STR = os.getenv('API_ID')
 API_HASH = os.getenv('API_HASH')
 SESSION = os.getenv('SESSION')
+# Несколько аккаунтов в одном процессе: SESSIONS=main,second (через запятую)
+SESSIONS = [s.strip() for s in (os.getenv('SESSIONS') or '').split(',') if s.strip()] or ([SESSION] if SESSION else [])
 
 # Проверка и преобразование API_ID в число
 try:
@@ -21,86 +30,75 @@ except (ValueError, TypeError):
     print("❌ Ошибка: API_ID в файле .env должен быть числом.")
     raise SystemExit(1)
 
-if not all([API_ID, API_HASH, SESSION]):
-    print("❌ Ошибка: Не все переменные (API_ID, API_HASH, SESSION) заданы в файле .env.")
+if not all([API_ID, API_HASH, SESSIONS]):
+    print("❌ Ошибка: Не все переменные (API_ID, API_HASH, SESSION или SESSIONS) заданы в файле .env.")
     raise SystemExit(1)
 
 # --- Константы/настройки поведения ---
 ALERT_PREFIX = "🚨🚨🚨 "  # все оповещения сохраняем, остальное в 'Избранном' удаляем
 MD = 'md'
 
+# Значения, заданные при запуске (флаги командной строки), важнее config.py
+_overrides: Dict[str, Any] = {}
 
-def save_config_to_file(tracked_list: List[str], blacklist_list: List[str], exclusion_list: List[str] = None):
-    """Сохраняет обновленные списки в файл config.py."""
-    try:
-        # Читаем текущий config.py
-        with open('config.py', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Обновляем списки в контенте
-        # Обновляем TRACKED
-        tracked_pattern = r'TRACKED = \[.*?\]'
-        tracked_replacement = f'TRACKED = {tracked_list}'
-        content = re.sub(tracked_pattern, tracked_replacement, content, flags=re.DOTALL)
-        
-        # Обновляем BLACKLIST
-        blacklist_pattern = r'BLACKLIST = \[.*?\]'
-        blacklist_replacement = f'BLACKLIST = {blacklist_list}'
-        content = re.sub(blacklist_pattern, blacklist_replacement, content, flags=re.DOTALL)
-        
-        # Обновляем EXCLUSION_LIST если передан
-        if exclusion_list is not None:
-            exclusion_pattern = r'EXCLUSION_LIST = \[.*?\]'
-            exclusion_replacement = f'EXCLUSION_LIST = {exclusion_list}'
-            content = re.sub(exclusion_pattern, exclusion_replacement, content, flags=re.DOTALL)
-        
-        # Сохраняем обновленный файл
-        with open('config.py', 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print("✅ Настройки сохранены в config.py")
-        
-    except Exception as e:
-        print(f"❌ Ошибка при сохранении: {e}")
 
-
-def save_exclusion_config_to_file(exclusion_list: List[str]):
-    """Сохраняет только список исключений в файл config.py."""
-    try:
-        # Читаем текущий config.py
-        with open('config.py', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Обновляем EXCLUSION_LIST
-        exclusion_pattern = r'EXCLUSION_LIST = \[.*?\]'
-        exclusion_replacement = f'EXCLUSION_LIST = {exclusion_list}'
-        content = re.sub(exclusion_pattern, exclusion_replacement, content, flags=re.DOTALL)
-        
-        # Сохраняем обновленный файл
-        with open('config.py', 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print("✅ Список исключений сохранен в config.py")
-        
-    except Exception as e:
-        print(f"❌ Ошибка при сохранении списка исключений: {e}")
+def set_config_overrides(**values):
+    """Переопределяет настройки на время работы процесса (например, из флагов командной строки)."""
+    _overrides.update({key: value for key, value in values.items() if value is not None})
 
 
 def get_config():
     """Возвращает текущую конфигурацию."""
-    return {
+    config = {
         'API_ID': API_ID,
         'API_HASH': API_HASH,
-        'SESSION': SESSION,
+        'SESSION': SESSION or SESSIONS[0],
+        'SESSIONS': SESSIONS,
         'TRACKED': TRACKED,
         'BLACKLIST': BLACKLIST,
         'EXCLUSION_LIST': EXCLUSION_LIST,
         'EXPORT_GROUP': EXPORT_GROUP,
         'DELETE_CHUNK': DELETE_CHUNK,
         'DELETE_PAUSE': DELETE_PAUSE,
+        'PURGE_CONCURRENCY': PURGE_CONCURRENCY,
+        'PURGE_PLAN': PURGE_PLAN,
+        'PURGE_INCREMENTAL': PURGE_INCREMENTAL,
+        'PURGE_ADMIN_FAST_PATH': PURGE_ADMIN_FAST_PATH,
+        'PLAN_FILE_OUT': PLAN_FILE_OUT,
+        'PLAN_FILE_IN': PLAN_FILE_IN,
+        'PLAN_FILE_LIMIT': PLAN_FILE_LIMIT,
+        'LIVE_DELETE_WINDOW_MS': LIVE_DELETE_WINDOW_MS,
+        'STATE_DB': STATE_DB,
+        'LISTS_DB': LISTS_DB,
+        'ENTITY_CACHE_TTL': ENTITY_CACHE_TTL,
+        'RESOLVE_CONCURRENCY': RESOLVE_CONCURRENCY,
+        'LIST_RELOAD_POLL_SECONDS': LIST_RELOAD_POLL_SECONDS,
+        'PRESENCE_LOOKUP_MAX': PRESENCE_LOOKUP_MAX,
+        'PRESENCE_LISTING_MAX': PRESENCE_LISTING_MAX,
+        'PRESENCE_LISTING_COST': PRESENCE_LISTING_COST,
+        'MEMBERSHIP_SNAPSHOT_SECONDS': MEMBERSHIP_SNAPSHOT_SECONDS,
+        'MEMBERSHIP_REVERIFY_SECONDS': MEMBERSHIP_REVERIFY_SECONDS,
+        'HEADLESS_MODE': HEADLESS_MODE,
+        'METRICS_PORT': METRICS_PORT,
+        'METRICS_FILE': METRICS_FILE,
+        'METRICS_FILE_SECONDS': METRICS_FILE_SECONDS,
+        'RATE_LIMIT_INITIAL': RATE_LIMIT_INITIAL,
+        'RATE_LIMIT_MIN': RATE_LIMIT_MIN,
+        'RATE_LIMIT_MAX': RATE_LIMIT_MAX,
+        'RATE_LIMIT_BURST': RATE_LIMIT_BURST,
+        'RATE_LIMIT_LIVE_STREAK': RATE_LIMIT_LIVE_STREAK,
+        'SIGN_IN_FLOOD_SLEEP': SIGN_IN_FLOOD_SLEEP,
         'ON_START_PURGE': ON_START_PURGE,
         'DELETE_SAVED_MESSAGES': DELETE_SAVED_MESSAGES,
         'DELETE_SAVED_DELAY_SECONDS': DELETE_SAVED_DELAY_SECONDS,
+        'AUTO_DELETE_SLOT_SECONDS': AUTO_DELETE_SLOT_SECONDS,
+        'ALERT_DIGEST_SECONDS': ALERT_DIGEST_SECONDS,
+        'ENABLE_LOGGING': ENABLE_LOGGING,
+        'SHOW_DELETION_NOTIFICATIONS': SHOW_DELETION_NOTIFICATIONS,
+        'LOG_FORMAT': LOG_FORMAT,
+        'LOG_PROGRESS_SECONDS': LOG_PROGRESS_SECONDS,
         'ALERT_PREFIX': ALERT_PREFIX,
         'MD': MD
     }
+    config.update(_overrides)
+    return config
@@ -0,0 +1,62 @@
+import sqlite3
+import time
+from typing import Optional
+
+from .config_manager import get_config
+
+
+def top_message_id(dialog) -> int:
+    """ID последнего сообщения диалога (0 — истории нет)."""
+    return dialog.message.id if dialog.message else 0
+
+
+class DialogSnapshot:
+    """
+    Снимок диалогов после завершённых зачисток (SQLite). Для пары
+    (задача, диалог) хранит top_message на момент, когда диалог был пройден
+    целиком: всё, что не выше этого ID, уже вычищено. ID сообщений в чате
+    только растут, поэтому повторная зачистка пропускает диалоги, где
+    top_message не сдвинулся, а в остальных ищет только сообщения выше отметки.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dialog_snapshot ("
+            " job TEXT NOT NULL,"
+            " dialog_id INTEGER NOT NULL,"
+            " top_message INTEGER NOT NULL,"
+            " purged_at REAL NOT NULL,"
+            " PRIMARY KEY (job, dialog_id))"
+        )
+        self.conn.commit()
+
+    def watermark(self, job: str, dialog_id: int) -> int:
+        """До какого ID диалог уже вычищен задачей (0 — ни разу не проходился целиком)."""
+        row = self.conn.execute(
+            "SELECT top_message FROM dialog_snapshot WHERE job = ? AND dialog_id = ?", (job, dialog_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def record(self, job: str, dialog_id: int, top_message: int):
+        """Запоминает, что диалог вычищен до top_message включительно (назад отметку не двигает)."""
+        if not top_message:
+            return
+        self.conn.execute(
+            "INSERT INTO dialog_snapshot (job, dialog_id, top_message, purged_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (job, dialog_id) DO UPDATE SET"
+            " top_message = MAX(top_message, excluded.top_message), purged_at = excluded.purged_at",
+            (job, dialog_id, top_message, time.time())
+        )
+        self.conn.commit()
+
+
+_dialog_snapshot: Optional[DialogSnapshot] = None
+
+
+def get_dialog_snapshot() -> DialogSnapshot:
+    """Общий на процесс снимок диалогов."""
+    global _dialog_snapshot
+    if _dialog_snapshot is None:
+        _dialog_snapshot = DialogSnapshot(get_config()['STATE_DB'])
+    return _dialog_snapshot
@@ -0,0 +1,117 @@
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from telethon.tl.types import InputPeerUser, User
+from telethon.utils import get_display_name
+
+from .config_manager import get_config
+
+
+@dataclass
+class CachedUser:
+    """Результат резолва пользователя, сохранённый на диске."""
+    user_id: int
+    access_hash: int
+    name: str
+    resolved_at: float
+
+
+def cache_key(item) -> str:
+    """Ключ кэша: '@username' в нижнем регистре или 'id:<число>'."""
+    if isinstance(item, int):
+        return f"id:{item}"
+    item = str(item).strip()
+    return f"@{item.lstrip('@').lower()}"
+
+
+def display_name(entity: User) -> str:
+    """Имя пользователя для списков и логов."""
+    return get_display_name(entity) or (entity.username or str(entity.id))
+
+
+class EntityCache:
+    """
+    Дисковый кэш юзернейм/ID → (id, access_hash, имя) с TTL.
+    Живёт в той же SQLite-базе состояния, что и контрольные точки. Один на
+    все аккаунты процесса, но записи разделены по аккаунту (account — ID
+    владельца сессии): access_hash пользователя у каждого аккаунта свой.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entity_cache)")}
+        if columns and 'account_id' not in columns:
+            # Кэш прежнего формата (без разделения по аккаунтам) проще собрать заново
+            self.conn.execute("DROP TABLE entity_cache")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entity_cache ("
+            " account_id INTEGER NOT NULL,"
+            " key TEXT NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " access_hash INTEGER NOT NULL,"
+            " name TEXT NOT NULL,"
+            " resolved_at REAL NOT NULL,"
+            " PRIMARY KEY (account_id, key))"
+        )
+        self.conn.commit()
+
+    def get(self, item, account: int = 0, allow_stale: bool = False) -> Optional[CachedUser]:
+        """Запись из кэша; просроченная возвращается только при allow_stale=True."""
+        row = self.conn.execute(
+            "SELECT user_id, access_hash, name, resolved_at FROM entity_cache WHERE account_id = ? AND key = ?",
+            (account, cache_key(item))
+        ).fetchone()
+        if not row:
+            return None
+        cached = CachedUser(*row)
+        if not allow_stale and time.time() - cached.resolved_at > self.ttl:
+            return None
+        return cached
+
+    def put_many(self, entities: Iterable[User], account: int = 0, queries: Optional[Dict[object, int]] = None):
+        """
+        Сохраняет пачку пользователей одной транзакцией: под ID, под юзернеймом
+        (если он есть) и под исходными запросами из queries ({запрос: user_id}).
+        """
+        now = time.time()
+        aliases: Dict[int, set] = {}
+        for query, user_id in (queries or {}).items():
+            aliases.setdefault(user_id, set()).add(cache_key(query))
+        rows = []
+        for entity in entities:
+            row = (entity.id, entity.access_hash or 0, display_name(entity), now)
+            keys = {cache_key(entity.id)} | aliases.get(entity.id, set())
+            if entity.username:
+                keys.add(cache_key(entity.username))
+            rows.extend((account, key) + row for key in keys)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entity_cache (account_id, key, user_id, access_hash, name, resolved_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def prime_session(self, client, users: Iterable[CachedUser]):
+        """
+        Передаёт access_hash из кэша в сессию Telethon, чтобы последующие
+        запросы по ID пользователя (iter_messages(from_user=...), фильтры событий)
+        не требовали повторного резолва по сети.
+        """
+        peers = [InputPeerUser(u.user_id, u.access_hash) for u in users if u.access_hash]
+        if peers:
+            client.session.process_entities(peers)
+
+
+_entity_cache: Optional[EntityCache] = None
+
+
+def get_entity_cache() -> EntityCache:
+    """Общий на процесс кэш сущностей."""
+    global _entity_cache
+    if _entity_cache is None:
+        config = get_config()
+        _entity_cache = EntityCache(config['STATE_DB'], config['ENTITY_CACHE_TTL'])
+    return _entity_cache
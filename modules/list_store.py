@@ -0,0 +1,179 @@
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config_manager import get_config
+
+LIST_NAMES = ('tracked', 'blacklist', 'exclusion')
+
+
+def normalize_entry(entry) -> str:
+    """Запись списка в каноническом виде: '@username' или числовой ID строкой."""
+    entry = str(entry).strip()
+    if not entry:
+        return ""
+    if entry.lstrip('-').isdigit() or entry.startswith('@'):
+        return entry
+    return "@" + entry
+
+
+class ListStore:
+    """
+    Хранилище списков TRACKED/BLACKLIST/EXCLUSION (SQLite).
+    Изменения вносятся точечно (добавить/удалить запись) в одной транзакции,
+    рядом с юзернеймом хранится резолвленный ID. При первом запуске списки
+    переносятся из config.py.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS list_entries ("
+            " list_name TEXT NOT NULL,"
+            " entry TEXT NOT NULL,"
+            " user_id INTEGER,"
+            " display_name TEXT,"
+            " added_at REAL NOT NULL,"
+            " PRIMARY KEY (list_name, entry));"
+            "CREATE TABLE IF NOT EXISTS list_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        self.conn.commit()
+
+    def is_seeded(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM list_meta WHERE key = 'seeded'").fetchone() is not None
+
+    def seed_from_config(self, force: bool = False):
+        """Переносит списки из config.py (один раз, либо принудительно при force=True)."""
+        if self.is_seeded() and not force:
+            return
+        config = get_config()
+        with self.conn:
+            for name, entries in zip(LIST_NAMES, (config['TRACKED'], config['BLACKLIST'], config['EXCLUSION_LIST'])):
+                self._replace(name, entries)
+            self.conn.execute("INSERT OR REPLACE INTO list_meta (key, value) VALUES ('seeded', ?)", (str(time.time()),))
+
+    def load(self, name: str) -> List[str]:
+        """Записи списка в порядке добавления."""
+        return [row[0] for row in self.conn.execute(
+            "SELECT entry FROM list_entries WHERE list_name = ? ORDER BY added_at, rowid", (name,)
+        )]
+
+    def load_all(self) -> Tuple[List[str], List[str], List[str]]:
+        """Все три списка: (tracked, blacklist, exclusion)."""
+        self.seed_from_config()
+        return self.load('tracked'), self.load('blacklist'), self.load('exclusion')
+
+    def resolved(self, name: str) -> Dict[str, Tuple[int, str]]:
+        """Записи списка, для которых уже известен ID: {запись: (user_id, имя)}."""
+        return {row[0]: (row[1], row[2]) for row in self.conn.execute(
+            "SELECT entry, user_id, display_name FROM list_entries WHERE list_name = ? AND user_id IS NOT NULL",
+            (name,)
+        )}
+
+    def add(self, name: str, entries: Iterable) -> int:
+        """Добавляет записи (уже существующие пропускаются). Возвращает число добавленных."""
+        with self.conn:
+            return self._add(name, entries)
+
+    def remove(self, name: str, entries: Iterable) -> int:
+        """Удаляет записи. Возвращает число удалённых."""
+        with self.conn:
+            return self._remove(name, entries)
+
+    def replace(self, name: str, entries: Iterable):
+        """Приводит список к заданному содержимому, меняя только отличающиеся записи."""
+        with self.conn:
+            self._replace(name, entries)
+
+    def set_resolved_many(self, name: str, resolved: Dict[str, Tuple[int, str]]):
+        """Запоминает резолвленные ID рядом с записями ({запись: (user_id, имя)}) одной транзакцией."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE list_entries SET user_id = ?, display_name = ? WHERE list_name = ? AND entry = ?",
+                [(user_id, user_name, name, normalize_entry(entry))
+                 for entry, (user_id, user_name) in resolved.items()]
+            )
+
+    def _add(self, name: str, entries: Iterable) -> int:
+        now = time.time()
+        rows = [(name, entry, now) for entry in dict.fromkeys(map(normalize_entry, entries)) if entry]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO list_entries (list_name, entry, added_at) VALUES (?, ?, ?)", rows
+        )
+        return self.conn.total_changes - before
+
+    def _remove(self, name: str, entries: Iterable) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "DELETE FROM list_entries WHERE list_name = ? AND entry = ?",
+            [(name, normalize_entry(entry)) for entry in entries]
+        )
+        return self.conn.total_changes - before
+
+    def _replace(self, name: str, entries: Iterable):
+        wanted = [entry for entry in dict.fromkeys(map(normalize_entry, entries)) if entry]
+        current = set(self.load(name))
+        self._remove(name, current - set(wanted))
+        self._add(name, [entry for entry in wanted if entry not in current])
+
+
+_list_store: Optional[ListStore] = None
+
+
+def get_list_store() -> ListStore:
+    """Общее на процесс хранилище списков."""
+    global _list_store
+    if _list_store is None:
+        _list_store = ListStore(get_config()['LISTS_DB'])
+    return _list_store
+
+
+def load_lists() -> Tuple[List[str], List[str], List[str]]:
+    """Читает списки (tracked, blacklist, exclusion) из хранилища."""
+    return get_list_store().load_all()
+
+
+def save_lists(tracked_list: List[str], blacklist_list: List[str], exclusion_list: Optional[List[str]] = None):
+    """Сохраняет списки в хранилище (меняются только отличающиеся записи)."""
+    try:
+        store = get_list_store()
+        with store.conn:
+            store._replace('tracked', tracked_list)
+            store._replace('blacklist', blacklist_list)
+            if exclusion_list is not None:
+                store._replace('exclusion', exclusion_list)
+        print(f"✅ Настройки сохранены в {store.path}")
+    except Exception as e:
+        print(f"❌ Ошибка при сохранении: {e}")
+
+
+def main(argv: List[str]):
+    """
+    Правка списков из командной строки (работающий TG-Guard подхватит изменения сам):
+        python -m modules.list_store show
+        python -m modules.list_store add blacklist @spammer
+        python -m modules.list_store remove tracked @user
+    """
+    store = get_list_store()
+    store.seed_from_config()
+    if len(argv) >= 1 and argv[0] == "show":
+        for name in LIST_NAMES:
+            entries = store.load(name)
+            print(f"{name.upper()} ({len(entries)}): {entries}")
+        return
+    if len(argv) >= 3 and argv[0] in ("add", "remove") and argv[1] in LIST_NAMES:
+        action, name, entries = argv[0], argv[1], argv[2:]
+        if action == "add":
+            print(f"✅ Добавлено в {name.upper()}: {store.add(name, entries)}")
+        else:
+            print(f"✅ Удалено из {name.upper()}: {store.remove(name, entries)}")
+        return
+    print(main.__doc__)
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from telethon import TelegramClient
+from telethon.utils import get_display_name
+
+from .config_manager import get_config
+from .metrics import get_metrics
+from .rate_limiter import LANE_LIVE, get_rate_limiter
+
+log = logging.getLogger(__name__)
+
+# Границы корзин гистограммы размеров пачек
+BATCH_SIZE_BUCKETS = (1, 5, 20, 50, 100)
+
+
+@dataclass
+class PendingBatch:
+    """Сообщения одного чата, ждущие удаления."""
+    peer: object
+    ids: Dict[int, object] = field(default_factory=dict)  # ID сообщения → событие (для лога)
+    added_at: Dict[int, float] = field(default_factory=dict)  # ID сообщения → когда поставлено в очередь
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class DeletionAggregator:
+    """
+    Собирает живые удаления по чатам в пачки. Первое сообщение в «тихом»
+    чате удаляется сразу; если следом в течение окна приходят ещё, они копятся
+    и уходят одним delete_messages по истечении окна или при наборе max_batch.
+    """
+
+    def __init__(self, client: TelegramClient, window: float, max_batch: int):
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[int, PendingBatch] = {}
+        self._last_flush: Dict[int, float] = {}
+        self.batches = 0
+        self.messages = 0
+
+    def add(self, chat_id: int, peer, msg_id: int, event=None):
+        """Ставит сообщение на удаление."""
+        now = time.monotonic()
+        batch = self._pending.get(chat_id)
+        if batch is None:
+            batch = PendingBatch(peer)
+            self._pending[chat_id] = batch
+        batch.ids[msg_id] = event
+        batch.added_at.setdefault(msg_id, now)
+
+        quiet = now - self._last_flush.get(chat_id, 0.0) >= self.window
+        if len(batch.ids) >= self.max_batch or (quiet and len(batch.ids) == 1):
+            self._flush(chat_id)
+        elif batch.timer is None:
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, chat_id)
+
+    def pending(self) -> int:
+        """Сколько сообщений сейчас ждут удаления."""
+        return sum(len(batch.ids) for batch in self._pending.values())
+
+    def average_batch(self) -> float:
+        return self.messages / self.batches if self.batches else 0.0
+
+    def _flush(self, chat_id: int):
+        batch = self._pending.pop(chat_id, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        self._last_flush[chat_id] = time.monotonic()
+        asyncio.create_task(self._delete(batch))
+
+    async def _delete(self, batch: PendingBatch):
+        ids = list(batch.ids)
+        try:
+            await get_rate_limiter(self.client).call(
+                lambda: self.client.delete_messages(batch.peer, ids, revoke=False), lane=LANE_LIVE
+            )
+        except Exception as e:
+            log.error(f"❌ Ошибка при удалении пачки из {len(ids)} сообщ.: {e}")
+            return
+        # Задержка у каждого сообщения своя: от постановки в очередь до удаления
+        done_at = time.monotonic()
+        latencies = [done_at - batch.added_at[msg_id] for msg_id in ids]
+        self.batches += 1
+        self.messages += len(ids)
+        metrics = get_metrics()
+        metrics.inc('tg_guard_messages_deleted_total', len(ids), source="live")
+        for latency in latencies:
+            metrics.observe('tg_guard_live_delete_seconds', latency)
+        metrics.observe('tg_guard_live_delete_batch_size', len(ids), buckets=BATCH_SIZE_BUCKETS)
+        await self._log(batch, ids, max(latencies) * 1000)
+
+    async def _log(self, batch: PendingBatch, ids: List[int], latency_ms: float):
+        """
+        Пишет в лог после удаления; имена берутся уже вне критического пути.
+        latency_ms — задержка самого долгого сообщения пачки. При выключенных SHOW_DELETION_NOTIFICATIONS или ENABLE_LOGGING имена не запрашиваются вовсе.
+        """
+        if not get_config()['SHOW_DELETION_NOTIFICATIONS'] or not log.isEnabledFor(logging.DEBUG):
+            return
+        event = next((e for e in batch.ids.values() if e is not None), None)
+        sender_name = chat_name = "?"
+        if event is not None:
+            try:
+                sender_name = get_display_name(await event.get_sender())
+                chat_name = get_display_name(await event.get_chat())
+            except Exception:
+                sender_name, chat_name = str(event.sender_id), str(event.chat_id)
+        fields = {'chat': chat_name, 'sender': sender_name, 'deleted': len(ids), 'latency_ms': round(latency_ms, 1)}
+        if len(ids) == 1:
+            log.debug(f"🚫 Удалено сообщение от {sender_name} в {chat_name} ({latency_ms:.1f} мс)", extra=fields)
+        else:
+            log.debug(f"🚫 Удалено {len(ids)} сообщ. от {sender_name} в {chat_name} одной пачкой "
+                      f"(до {latency_ms:.0f} мс, средняя пачка {self.average_batch():.1f})", extra=fields)
+
+
+_aggregators: Dict[TelegramClient, DeletionAggregator] = {}
+
+
+def get_deletion_aggregator(client: TelegramClient) -> DeletionAggregator:
+    """Агрегатор живых удалений для клиента (один на клиента)."""
+    aggregator = _aggregators.get(client)
+    if aggregator is None:
+        config = get_config()
+        aggregator = DeletionAggregator(client, config['LIVE_DELETE_WINDOW_MS'] / 1000, config['DELETE_CHUNK'])
+        _aggregators[client] = aggregator
+        get_metrics().gauge('tg_guard_live_delete_pending', "Живые удаления, ждущие отправки пачкой",
+                            lambda: sum(a.pending() for a in _aggregators.values()))
+    return aggregator
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import signal
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from telethon import TelegramClient
+
+from .config_manager import get_config
+from .entity_cache import cache_key
+from .list_store import LIST_NAMES, get_list_store, load_lists, normalize_entry
+from .utils import resolve_user_entries
+
+log = logging.getLogger(__name__)
+
+# Слушатель изменений: (имя списка, добавленные {id: имя}, удалённые {id: имя})
+ListChangeListener = Callable[[str, Dict[int, str], Dict[int, str]], Optional[Awaitable[None]]]
+
+
+class LiveLists:
+    """
+    Текущие списки TRACKED/BLACKLIST/EXCLUSION, общие для всех аккаунтов процесса.
+    Обработчики событий читают отсюда множества ID, поэтому при перезагрузке
+    достаточно подменить их целиком — без перерегистрации и переподключения.
+    ID пользователей одинаковы для всех аккаунтов, а access_hash — нет, поэтому
+    новые записи резолвятся ещё и каждым подключённым аккаунтом.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, Tuple[int, str]]] = {name: {} for name in LIST_NAMES}
+        self.extra_tracked: Dict[int, str] = {}  # Участники EXPORT_GROUP — уже с ID, не перечитываются из хранилища
+        self.tracked_ids: FrozenSet[int] = frozenset()
+        self.blacklist_ids: FrozenSet[int] = frozenset()
+        self.exclusion_ids: FrozenSet[int] = frozenset()
+        self._listeners: List[ListChangeListener] = []
+        self._clients: List[TelegramClient] = []
+        self._lock: Optional[asyncio.Lock] = None
+
+    def map(self, name: str) -> Dict[int, str]:
+        """Список в виде {user_id: display_name}."""
+        return {user_id: user_name for user_id, user_name in self.entries[name].values()}
+
+    def on_change(self, listener: ListChangeListener):
+        """Подписка на изменения списков после перезагрузки."""
+        self._listeners.append(listener)
+
+    def prime(self, tracked: Iterable, blacklist: Iterable, exclusion: Iterable):
+        """
+        Заполняет множества ID тем, что хранилище запомнило в прошлых запусках,
+        без запросов к серверу: обработчики событий работают сразу после входа,
+        пока идёт load(). Записи, ещё ни разу не резолвленные, и участники
+        EXPORT_GROUP появятся после load().
+        """
+        store = get_list_store()
+        for name, items in zip(LIST_NAMES, (tracked, blacklist, exclusion)):
+            known = store.resolved(name)
+            ids = {known[entry][0] for entry in map(normalize_entry, items) if entry in known}
+            setattr(self, f"{name}_ids", frozenset(ids))
+
+    async def load(self, client: TelegramClient, tracked: Iterable, blacklist: Iterable, exclusion: Iterable,
+                   extra_tracked: Optional[Dict[int, str]] = None) -> Tuple[Dict[int, str], Dict[int, str], Dict[int, str]]:
+        """
+        Первичная загрузка: резолвит списки и возвращает карты (tracked, blacklist, exclusion).
+        extra_tracked — уже известные {user_id: имя} (участники EXPORT_GROUP), их резолвить не нужно.
+        Следующий аккаунт подключается к уже загруженным спискам: он резолвит
+        все записи у себя (в основном из кэша), а общие множества ID дополняются.
+        """
+        self.extra_tracked.update(extra_tracked or {})
+        if self._clients:
+            await resolve_user_entries(client, [*tracked, *blacklist, *exclusion])
+        self._clients.append(client)
+        await self.apply(client, 'tracked', tracked, self.extra_tracked)
+        await self.apply(client, 'blacklist', blacklist)
+        await self.apply(client, 'exclusion', exclusion)
+        return self.map('tracked'), self.map('blacklist'), self.map('exclusion')
+
+    async def apply(self, client: TelegramClient, name: str, items: Iterable,
+                    known: Optional[Dict[int, str]] = None) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """
+        Применяет новое содержимое списка: резолвит только добавленные записи
+        и атомарно подменяет множество ID. known — записи {user_id: имя}, ID
+        которых уже известен. Возвращает (добавленные, удалённые).
+        """
+        known_entries = {cache_key(user_id): (user_id, user_name) for user_id, user_name in (known or {}).items()}
+        wanted = {cache_key(item): item for item in items if item}
+        current = self.entries[name]
+        added_items = [item for key, item in wanted.items() if key not in current]
+        resolved = await resolve_user_entries(client, added_items) if added_items else {}
+        for other in self._clients:
+            if other is not client and added_items:
+                await resolve_user_entries(other, added_items)
+        # Запоминаем ID рядом с записями хранилища
+        if resolved:
+            get_list_store().set_resolved_many(
+                name, {item: resolved[key] for key, item in wanted.items() if key in resolved}
+            )
+
+        entries = {key: value for key, value in current.items() if key in wanted}
+        entries.update(resolved)
+        entries.update(known_entries)
+        old_ids = {user_id for user_id, _ in current.values()}
+        new_ids = {user_id for user_id, _ in entries.values()}
+        old_map = self.map(name)
+
+        self.entries[name] = entries
+        setattr(self, f"{name}_ids", frozenset(new_ids))
+
+        added = {user_id: user_name for user_id, user_name in entries.values() if user_id not in old_ids}
+        removed = {user_id: old_map[user_id] for user_id in old_ids - new_ids}
+        return added, removed
+
+    async def reload(self, client: TelegramClient):
+        """Перечитывает списки из хранилища и применяет только изменения."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            tracked, blacklist, exclusion = load_lists()
+            changes = {
+                'tracked': await self.apply(client, 'tracked', tracked, self.extra_tracked),
+                'blacklist': await self.apply(client, 'blacklist', blacklist),
+                'exclusion': await self.apply(client, 'exclusion', exclusion),
+            }
+            for name, (added, removed) in changes.items():
+                if not (added or removed):
+                    continue
+                log.info(f"[RELOAD] 🔄 {name.upper()}: +{len(added)} {list(added.values())} "
+                         f"−{len(removed)} {list(removed.values())}")
+                for listener in self._listeners:
+                    result = listener(name, added, removed)
+                    if asyncio.iscoroutine(result):
+                        asyncio.create_task(result)
+            if not any(added or removed for added, removed in changes.values()):
+                log.info("[RELOAD] ℹ️ Списки не изменились")
+
+
+_live_lists: Optional[LiveLists] = None
+
+
+def get_live_lists() -> LiveLists:
+    """Общие на процесс живые списки."""
+    global _live_lists
+    if _live_lists is None:
+        _live_lists = LiveLists()
+    return _live_lists
+
+
+_reloader_started = False
+
+
+def start_list_reloader(client: TelegramClient):
+    """
+    Запускает горячую перезагрузку списков: по SIGHUP и (если
+    LIST_RELOAD_POLL_SECONDS > 0) при изменении хранилища списков.
+    Списки общие, поэтому повторный вызов (для другого аккаунта) ничего не делает.
+    """
+    global _reloader_started
+    if _reloader_started:
+        return
+    _reloader_started = True
+    lists = get_live_lists()
+    path = get_config()['LISTS_DB']
+    loop = asyncio.get_running_loop()
+
+    async def safe_reload():
+        try:
+            await lists.reload(client)
+        except Exception as e:
+            log.error(f"[RELOAD] ❌ Не удалось перезагрузить списки: {e}")
+
+    def trigger():
+        asyncio.create_task(safe_reload())
+
+    if hasattr(signal, 'SIGHUP'):
+        try:
+            loop.add_signal_handler(signal.SIGHUP, trigger)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    poll_seconds = get_config()['LIST_RELOAD_POLL_SECONDS']
+    if poll_seconds <= 0:
+        return
+
+    async def watch():
+        last_mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+        while True:
+            await asyncio.sleep(poll_seconds)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+            if mtime != last_mtime:
+                await safe_reload()
+                # Сама перезагрузка дописывает ID в хранилище — это не повод перечитывать ещё раз
+                last_mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+    asyncio.create_task(watch())
@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Optional
+
+from .config_manager import get_config
+
+# Стандартные поля LogRecord — всё остальное пришло через extra= и попадает в JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: время, уровень, модуль, текст и поля из extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: Optional[int] = None):
+    """
+    Настраивает логирование процесса. Записи из event loop только кладутся
+    в очередь (QueueHandler), а в терминал/journald их пишет отдельный поток
+    (QueueListener), так что медленный вывод не тормозит обработку событий.
+    Уровень: DEBUG при ENABLE_LOGGING (подробности по каждому диалогу и
+    сообщению), иначе INFO. LOG_FORMAT = "json" — структурированный вывод.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    config = get_config()
+    if level is None:
+        level = logging.DEBUG if config['ENABLE_LOGGING'] else logging.INFO
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if config['LOG_FORMAT'] == 'json' else logging.Formatter("%(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # При выходе дописываем всё, что осталось в очереди
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level)
+    # Telethon на INFO сообщает о каждом переподключении — это не наше дело
+    logging.getLogger('telethon').setLevel(max(level, logging.WARNING))
+
+
+class ProgressLog:
+    """
+    Строка прогресса для длинных циклов: пишется не чаще раза в
+    LOG_PROGRESS_SECONDS (и в конце), вместо перерисовки на каждом шаге.
+    """
+
+    def __init__(self, logger: logging.Logger, tag: str, every: Optional[float] = None,
+                 unit: str = "диалогов"):
+        self.logger = logger
+        self.tag = tag
+        self.unit = unit
+        self.every = get_config()['LOG_PROGRESS_SECONDS'] if every is None else every
+        self.done = 0
+        self._last = 0.0
+        self._reported = 0
+
+    def step(self, last: str = "", count: int = 1):
+        self.done += count
+        now = time.monotonic()
+        if now - self._last >= self.every:
+            self._last = now
+            self._emit(last)
+
+    def finish(self):
+        if self.done != self._reported:
+            self._emit("")
+
+    def _emit(self, last: str):
+        self._reported = self.done
+        suffix = f" (последний: {last})" if last else ""
+        self.logger.info(f"[{self.tag}] ⚙️ Обработано {self.unit}: {self.done}{suffix}",
+                         extra={'progress': self.tag, 'done': self.done})
@@ -0,0 +1,174 @@
+import asyncio
+import atexit
+import hashlib
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from .accounts import account_id
+from .config_manager import get_config
+
+
+def tracked_fingerprint(tracked_ids: Iterable[int]) -> str:
+    """Отпечаток набора отслеживаемых: при его смене индекс строится заново."""
+    data = ",".join(str(i) for i in sorted(tracked_ids))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class MembershipIndex:
+    """
+    Индекс «чат → отслеживаемые участники» в памяти со снимком в SQLite.
+    Для каждого чата помнит ID последнего виденного сообщения (top_message):
+    после перезапуска перепроверяются только чаты, где с тех пор что-то
+    происходило, а остальные берутся из снимка без запросов к серверу.
+    У каждого аккаунта свой индекс (свои чаты), в базе они разделены по account.
+    """
+
+    def __init__(self, path: str, reverify_seconds: float, account: int = 0):
+        self.account = account
+        self.reverify_seconds = reverify_seconds
+        self.members: Dict[int, Set[int]] = {}
+        self.tops: Dict[int, int] = {}
+        self.verified_at: Dict[int, float] = {}
+        self.fingerprint = ""
+        self.dirty = False
+        self._autosave_task: Optional[asyncio.Task] = None
+
+        self.conn = sqlite3.connect(path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(membership_chats)")}
+        if columns and 'account_id' not in columns:
+            # Снимок прежнего формата (без разделения по аккаунтам) проще построить заново
+            self.conn.executescript(
+                "DROP TABLE membership_chats; DROP TABLE IF EXISTS membership; DROP TABLE IF EXISTS membership_meta;"
+            )
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS membership_chats ("
+            " account_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, top_message INTEGER NOT NULL,"
+            " verified_at REAL NOT NULL, PRIMARY KEY (account_id, chat_id));"
+            "CREATE TABLE IF NOT EXISTS membership ("
+            " account_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, user_id INTEGER NOT NULL,"
+            " PRIMARY KEY (account_id, chat_id, user_id));"
+            "CREATE TABLE IF NOT EXISTS membership_meta ("
+            " account_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (account_id, key));"
+        )
+        self.load()
+
+    def load(self):
+        """Загружает снимок индекса с диска."""
+        for chat_id, top, verified_at in self.conn.execute(
+                "SELECT chat_id, top_message, verified_at FROM membership_chats WHERE account_id = ?", (self.account,)):
+            self.tops[chat_id] = top
+            self.verified_at[chat_id] = verified_at
+            self.members[chat_id] = set()
+        for chat_id, user_id in self.conn.execute(
+                "SELECT chat_id, user_id FROM membership WHERE account_id = ?", (self.account,)):
+            self.members.setdefault(chat_id, set()).add(user_id)
+        row = self.conn.execute(
+            "SELECT value FROM membership_meta WHERE account_id = ? AND key = 'tracked'", (self.account,)
+        ).fetchone()
+        self.fingerprint = row[0] if row else ""
+
+    def save(self):
+        """Записывает снимок индекса на диск (одной транзакцией)."""
+        if not self.dirty:
+            return
+        account = self.account
+        with self.conn:
+            self.conn.execute("DELETE FROM membership_chats WHERE account_id = ?", (account,))
+            self.conn.execute("DELETE FROM membership WHERE account_id = ?", (account,))
+            self.conn.executemany(
+                "INSERT INTO membership_chats (account_id, chat_id, top_message, verified_at) VALUES (?, ?, ?, ?)",
+                [(account, chat_id, self.tops.get(chat_id, 0), self.verified_at.get(chat_id, 0.0))
+                 for chat_id in self.members]
+            )
+            self.conn.executemany(
+                "INSERT INTO membership (account_id, chat_id, user_id) VALUES (?, ?, ?)",
+                [(account, chat_id, user_id) for chat_id, users in self.members.items() for user_id in users]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO membership_meta (account_id, key, value) VALUES (?, 'tracked', ?)",
+                (account, self.fingerprint)
+            )
+        self.dirty = False
+
+    def start_autosave(self, interval: float):
+        """Периодически сохраняет снимок, пока работает event loop."""
+        if self._autosave_task and not self._autosave_task.done():
+            return
+
+        async def autosave():
+            while True:
+                await asyncio.sleep(interval)
+                self.save()
+
+        self._autosave_task = asyncio.create_task(autosave())
+
+    def ensure_tracked(self, tracked_ids: Iterable[int]) -> bool:
+        """Сбрасывает индекс, если список отслеживаемых изменился. Возвращает True при сбросе."""
+        fingerprint = tracked_fingerprint(tracked_ids)
+        if fingerprint == self.fingerprint:
+            return False
+        self.members.clear()
+        self.tops.clear()
+        self.verified_at.clear()
+        self.fingerprint = fingerprint
+        self.dirty = True
+        return True
+
+    def is_fresh(self, chat_id: int, top_message: int) -> bool:
+        """Можно ли доверять индексу: чат проверен, с тех пор не менялся и проверка не устарела."""
+        if chat_id not in self.members:
+            return False
+        if self.tops.get(chat_id) != top_message:
+            return False
+        return time.time() - self.verified_at.get(chat_id, 0.0) <= self.reverify_seconds
+
+    def members_of(self, chat_id: int) -> Set[int]:
+        return set(self.members.get(chat_id, ()))
+
+    def set_chat(self, chat_id: int, member_ids: Iterable[int], top_message: int):
+        """Запоминает результат проверки чата."""
+        self.members[chat_id] = set(member_ids)
+        self.tops[chat_id] = top_message
+        self.verified_at[chat_id] = time.time()
+        self.dirty = True
+
+    def forget_missing(self, chat_ids: Set[int]):
+        """Удаляет чаты, которых больше нет в списке диалогов."""
+        for chat_id in list(self.members):
+            if chat_id not in chat_ids:
+                self.members.pop(chat_id, None)
+                self.tops.pop(chat_id, None)
+                self.verified_at.pop(chat_id, None)
+                self.dirty = True
+
+    def touch(self, chat_id: int, message_id: int):
+        """Учитывает новое сообщение в уже проиндексированном чате (индекс остаётся актуальным)."""
+        if chat_id in self.members and message_id > self.tops.get(chat_id, 0):
+            self.tops[chat_id] = message_id
+            self.dirty = True
+
+    def add_members(self, chat_id: int, user_ids: Iterable[int]):
+        if chat_id in self.members:
+            self.members[chat_id].update(user_ids)
+            self.dirty = True
+
+    def remove_members(self, chat_id: int, user_ids: Iterable[int]):
+        if chat_id in self.members:
+            self.members[chat_id].difference_update(user_ids)
+            self.dirty = True
+
+
+_membership_indexes: Dict[int, MembershipIndex] = {}
+
+
+def get_membership_index(client=None) -> MembershipIndex:
+    """Индекс участников аккаунта (один на аккаунт); снимок сохраняется и при выходе."""
+    account = account_id(client) if client is not None else 0
+    index = _membership_indexes.get(account)
+    if index is None:
+        config = get_config()
+        index = MembershipIndex(config['STATE_DB'], config['MEMBERSHIP_REVERIFY_SECONDS'], account)
+        _membership_indexes[account] = index
+        atexit.register(index.save)
+    return index
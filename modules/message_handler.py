@@ -1,177 +1,490 @@
 import asyncio
-from typing import List, Dict
-from telethon import TelegramClient, events, errors
+import logging
+import math
+import os
+from typing import AsyncIterator, Callable, List, Dict, Optional, Set
+from telethon import TelegramClient, errors, events, functions
 from telethon.tl.types import Message
-from telethon.utils import get_display_name
 
 from .config_manager import get_config
-from .utils import is_broadcast_channel, is_alert_message_text
+from .utils import can_delete_participant_history, is_alert_message_text
+from .accounts import account_id
+from .auto_delete import get_auto_delete_wheel
+from .checkpoints import get_checkpoint_store
+from .dialog_snapshot import get_dialog_snapshot, top_message_id
+from .log_manager import ProgressLog
+from .metrics import get_metrics
+from .plan_file import PlanFile, PlanFileWriter
+from .purge_engine import DialogResult, run_dialog_workers
+from .purge_planner import plan_purge
+from .rate_limiter import LANE_BULK, get_rate_limiter
 
+log = logging.getLogger(__name__)
 
-async def schedule_delete_message(client: TelegramClient, entity, ids: List[int], delay: int):
-    """Задержка и удаление сообщений (только для меня), с обработкой ошибок."""
-    try:
-        await asyncio.sleep(delay)
-        if not ids:
-            return
-        await client.delete_messages(entity, ids, revoke=False)
-        print(f"[AUTO-DELETE] ✅ Удалены {len(ids)} сообщ. в '{get_display_name(entity) if entity != 'me' else 'Избранном'}'")
-    except errors.FloodWaitError as e:
-        print(f"[AUTO-DELETE] [FLOOD] Жду {e.seconds} сек...")
-        await asyncio.sleep(e.seconds + 1)
-    except Exception as e:
-        print(f"[AUTO-DELETE] [WARN] Ошибка при удалении: {e}")
+# Столько сообщений Telegram отдаёт за одну страницу GetHistory/Search
+HISTORY_PAGE = 100
 
 
-async def send_to_saved(client: TelegramClient, text: str, keep: bool = False, parse_mode: str = 'md') -> Message:
+async def send_to_saved(client: TelegramClient, text: str, keep: bool = False, parse_mode: str = 'md',
+                        lane: int = LANE_BULK) -> Message:
     """
     Отправляет сообщение себе ('Избранное'). Если keep=False и включен режим,
-    планирует автоудаление через DELETE_SAVED_DELAY_SECONDS.
+    планирует автоудаление через DELETE_SAVED_DELAY_SECONDS (колесо таймеров).
+    Срочные оповещения передают lane=LANE_LIVE, чтобы не ждать за фоновой зачисткой.
     """
     config = get_config()
-    msg = await client.send_message("me", text, parse_mode=parse_mode)
+    msg = await get_rate_limiter(client).call(
+        lambda: client.send_message("me", text, parse_mode=parse_mode), lane=lane
+    )
     if config['DELETE_SAVED_MESSAGES'] and not keep:
-        asyncio.create_task(
-            schedule_delete_message(
-                client, "me", [msg.id], config['DELETE_SAVED_DELAY_SECONDS']
-            )
-        )
+        get_auto_delete_wheel(client).schedule(msg.id, config['DELETE_SAVED_DELAY_SECONDS'])
     return msg
 
 
-async def delete_ids_for_me(client: TelegramClient, entity, ids: List[int]) -> int:
-    """Удаляет пачку сообщений 'только для меня' с обработкой FloodWait."""
-    if not ids:
+async def delete_chunk_for_me(client: TelegramClient, entity, chunk: List[int]) -> int:
+    """Удаляет одну пачку (не больше DELETE_CHUNK) 'только для меня'; темп и FloodWait — на лимитере."""
+    try:
+        await get_rate_limiter(client).call(lambda: client.delete_messages(entity, chunk, revoke=False))
+        get_metrics().inc('tg_guard_messages_deleted_total', len(chunk), source="purge")
+        return len(chunk)
+    except Exception as e:
+        log.error(f"[ERROR] Ошибка при удалении сообщений: {e}")
         return 0
 
+
+async def delete_participant_history(client: TelegramClient, entity, user_id: int) -> int:
+    """
+    Удаляет всю историю участника супергруппы на стороне сервера
+    (channels.DeleteParticipantHistory, нужны права админа). Сервер удаляет
+    большими порциями и возвращает offset > 0, пока что-то осталось.
+    Возвращает число удалённых сообщений.
+    """
+    limiter = get_rate_limiter(client)
+    total_deleted = 0
+    while True:
+        affected = await limiter.call(lambda: client(functions.channels.DeleteParticipantHistoryRequest(
+            channel=entity,
+            participant=user_id
+        )))
+        total_deleted += affected.pts_count
+        if not affected.offset:
+            break
+    get_metrics().inc('tg_guard_messages_deleted_total', total_deleted, source="purge")
+    return total_deleted
+
+
+async def stream_delete_for_me(
+    client: TelegramClient, entity, ids: AsyncIterator[int],
+    on_chunk_done: Optional[Callable[[List[int], int], None]] = None
+) -> int:
+    """
+    Конвейер «получение → удаление»: пока одна пачка удаляется, следующая уже
+    набирается из истории. В памяти держится не больше пары пачек по DELETE_CHUNK.
+    После каждой пачки вызывается on_chunk_done(пачка, сколько удалено).
+    """
     config = get_config()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+
+    async def producer():
+        try:
+            chunk: List[int] = []
+            async for msg_id in ids:
+                chunk.append(msg_id)
+                if len(chunk) >= config['DELETE_CHUNK']:
+                    await queue.put(chunk)
+                    chunk = []
+            if chunk:
+                await queue.put(chunk)
+        finally:
+            await queue.put(None)
+
+    fetcher = asyncio.create_task(producer())
     total_deleted = 0
-    for i in range(0, len(ids), config['DELETE_CHUNK']):
-        chunk = ids[i:i + config['DELETE_CHUNK']]
+    try:
         while True:
-            try:
-                await client.delete_messages(entity, chunk, revoke=False)
-                total_deleted += len(chunk)
-                await asyncio.sleep(config['DELETE_PAUSE'])
-                break
-            except errors.FloodWaitError as e:
-                print(f"[FLOOD] Слишком много запросов. Жду {e.seconds} секунд...")
-                await asyncio.sleep(e.seconds + 1)
-            except Exception as e:
-                print(f"[ERROR] Ошибка при удалении сообщений: {e}")
+            chunk = await queue.get()
+            if chunk is None:
                 break
+            deleted = await delete_chunk_for_me(client, entity, chunk)
+            total_deleted += deleted
+            if on_chunk_done:
+                on_chunk_done(chunk, deleted)
+    finally:
+        if not fetcher.done():
+            fetcher.cancel()
+    # Пробрасываем ошибку получения истории (если была) наружу, в воркер диалога
+    await fetcher
     return total_deleted
 
 
-async def purge_user_everywhere(client: TelegramClient, user_id: int, user_name: str):
-    """Удаляет все сообщения пользователя во всех ЛС и группах (каналы игнорируются)."""
+async def write_plan_ids(plan_out: PlanFileWriter, peer_id: int, ids: AsyncIterator[int]) -> int:
+    """
+    Фаза сканирования: найденные ID не удаляются, а дописываются в файл плана
+    блоками по DELETE_CHUNK (в памяти — не больше одного блока).
+    """
+    chunk_size = get_config()['DELETE_CHUNK']
+    planned = 0
+    chunk: List[int] = []
+    async for msg_id in ids:
+        chunk.append(msg_id)
+        if len(chunk) >= chunk_size:
+            plan_out.write_block(peer_id, chunk)
+            planned += len(chunk)
+            chunk = []
+    plan_out.write_block(peer_id, chunk)
+    return planned + len(chunk)
+
+
+async def iter_purgeable_dialogs(client: TelegramClient):
+    """Диалоги, в которых имеет смысл чистить сообщения: ЛС и группы (ни одного канала)."""
     from .utils import is_personal, is_group
-    
-    print(f"[PURGE] ⏳ Начинаю зачистку сообщений от '{user_name}'...")
-    total_deleted_count = 0
-    dialog_count = 0
 
-    try:
-        async for dialog in client.iter_dialogs():
-            entity = dialog.entity
-            # Сканим только ЛС и группы (ни одного канала)
-            if not (is_personal(entity) or is_group(entity)):
+    async for dialog in get_rate_limiter(client).iterate(client.iter_dialogs()):
+        if is_personal(dialog.entity) or is_group(dialog.entity):
+            yield dialog
+
+
+def make_progress_printer(progress: ProgressLog):
+    """Возвращает колбэк, отмечающий завершённые диалоги (строка прогресса — не чаще LOG_PROGRESS_SECONDS)."""
+    tag = progress.tag
+
+    def on_result(result: DialogResult):
+        if result.error:
+            log.warning(f"[{tag}] ⚠️  Ошибка в диалоге '{result.name}': {result.error}")
+        elif result.deleted:
+            log.debug(f"[{tag}] 🗑️ '{result.name}': удалено {result.deleted}",
+                      extra={'dialog_id': result.dialog_id, 'deleted': result.deleted})
+        progress.step(result.name)
+
+    return on_result
+
+
+def finish_checkpoint_jobs(store, jobs, results: List[DialogResult], tag: str):
+    """Сбрасывает контрольные точки, если все диалоги прошли без ошибок; иначе оставляет их для повторного запуска."""
+    failed = sum(1 for r in results if r.error)
+    if failed:
+        log.warning(f"[{tag}] ♻️ Диалогов с ошибками: {failed}. Повторный запуск продолжит с сохранённых точек.")
+        return
+    for job in jobs:
+        store.clear_job(job)
+
+
+def incremental_watermark(snapshot, job: str, dialog) -> Optional[int]:
+    """
+    Отметка из снимка, выше которой искать сообщения задачи в диалоге;
+    None — с прошлой полной зачистки в диалоге не появилось ни одного сообщения.
+    При PURGE_INCREMENTAL = False всегда 0 (история проходится целиком).
+    """
+    if not get_config()['PURGE_INCREMENTAL']:
+        return 0
+    watermark = snapshot.watermark(job, dialog.id)
+    if watermark and top_message_id(dialog) <= watermark:
+        return None
+    return watermark
+
+
+def prefer_history_scan(dialog, boundaries: Dict[int, int]) -> bool:
+    """
+    Дешевле ли один раз пройти историю диалога выше наименьшей границы и
+    отобрать отправителей на месте, чем искать сообщения каждого пользователя
+    отдельно. Поиск стоит минимум запрос на пользователя, проход — запрос на
+    HISTORY_PAGE сообщений. Разница ID — оценка числа сообщений сверху (в ЛС и
+    обычных группах нумерация общая на аккаунт), так что при сомнении остаётся поиск.
+    """
+    pages = math.ceil((top_message_id(dialog) - min(boundaries.values())) / HISTORY_PAGE)
+    return pages < len(boundaries)
+
+
+def print_unchanged(unchanged: Set[int], tag: str):
+    if unchanged:
+        log.info(f"[{tag}] ⏩ Без новых сообщений с прошлой зачистки, пропущено диалогов: {len(unchanged)}")
+
+
+async def purge_users_everywhere(client: TelegramClient, users_map: Dict[int, str],
+                                 plan_out: Optional[PlanFileWriter] = None) -> List[DialogResult]:
+    """
+    Удаляет все сообщения нескольких пользователей за один проход по диалогам
+    (каналы игнорируются). В каждом диалоге сообщения всех пользователей
+    собираются вместе и удаляются общими пачками. Если пользователей больше,
+    чем страниц новой истории, диалог проходится один раз целиком, а не
+    поиском по каждому (см. prefer_history_scan).
+    Для каждого пользователя ведётся своя задача в хранилище контрольных точек,
+    поэтому прерванная зачистка продолжается с того места, где остановилась.
+    Повторная зачистка (PURGE_INCREMENTAL) проходит только диалоги, где после
+    прошлой появились новые сообщения, и только выше отметки из снимка диалогов.
+    В супергруппах, где мы админ с правом удаления, история пользователя
+    удаляется целиком на стороне сервера (DeleteParticipantHistory) — без
+    постраничного поиска; если не вышло, диалог чистится обычным способом.
+    С plan_out выполняется только сканирование: найденные сообщения пишутся
+    в файл плана (см. purge_from_plan_file), ничего не удаляется и отметки
+    прогресса не сдвигаются.
+    """
+    from .utils import is_personal
+
+    config = get_config()
+    names = ", ".join(users_map.values())
+    action = "запись плана удаления" if plan_out else "зачистку"
+    log.info(f"[PURGE] ⏳ Начинаю {action} сообщений от {len(users_map)} польз. ({names}), "
+             f"параллельно: {config['PURGE_CONCURRENCY']}...")
+    found_per_user: Dict[int, int] = {user_id: 0 for user_id in users_map}
+    limiter = get_rate_limiter(client)
+    store = get_checkpoint_store()
+    snapshot = get_dialog_snapshot()
+    unchanged: Set[int] = set()
+    server_side: Set[int] = set()  # Диалоги, очищенные через DeleteParticipantHistory
+    # Прогресс у каждого аккаунта свой
+    jobs = {user_id: f"blacklist:{account_id(client)}:{user_id}" for user_id in users_map}
+    resumed_dialogs = sum(store.done_count(job) for job in jobs.values())
+    if resumed_dialogs:
+        log.info(f"[PURGE] ♻️ Продолжаю прерванную зачистку: уже завершено {resumed_dialogs} пар (пользователь, диалог)")
+
+    def pending(dialog) -> Dict[int, int]:
+        """Пользователи, для которых диалог ещё не пройден: {user_id: граница}."""
+        entity = dialog.entity
+        # В ЛС пишут только двое, поэтому спрашиваем историю лишь у собеседника
+        if is_personal(entity):
+            senders = [entity.id] if entity.id in users_map else []
+        else:
+            senders = list(users_map)
+        # Пропускаем пользователей, для которых диалог уже пройден в прошлом запуске
+        boundaries: Dict[int, int] = {}
+        for user_id in senders:
+            watermark = incremental_watermark(snapshot, jobs[user_id], dialog)
+            if watermark is None:
+                unchanged.add(dialog.id)
                 continue
+            boundary, done = store.get(jobs[user_id], dialog.id)
+            if not done:
+                boundaries[user_id] = max(boundary, watermark)
+        return boundaries
 
-            dialog_count += 1
-            print(f"\r[PURGE] Проверяю диалог {dialog_count}: {dialog.name}", end="")
-            ids_to_delete: List[int] = []
-            try:
-                async for msg in client.iter_messages(entity, from_user=user_id):
-                    ids_to_delete.append(msg.id)
+    def fast_path(dialog) -> bool:
+        # В план попадают только ID сообщений: серверное удаление — уже выполнение
+        return not plan_out and config['PURGE_ADMIN_FAST_PATH'] and can_delete_participant_history(dialog.entity)
 
-                if ids_to_delete:
-                    deleted_in_chat = await delete_ids_for_me(client, entity, ids_to_delete)
-                    total_deleted_count += deleted_in_chat
+    plan = await plan_purge(
+        client, iter_purgeable_dialogs(client), pending, "PURGE", server_side=fast_path
+    ) if config['PURGE_PLAN'] else None
+    if plan and not plan_out:
+        for dialog, user_ids in plan.cleared:
+            for user_id in user_ids:
+                snapshot.record(jobs[user_id], dialog.id, top_message_id(dialog))
 
-            except Exception:
-                # Некоторые чаты могут быть недоступны, это не критично
-                pass
-    finally:
-        print()  # Перевод строки после завершения цикла
+    async def worker(dialog) -> DialogResult:
+        entity = dialog.entity
+        boundaries = plan.pending_for(dialog) if plan else pending(dialog)
+        if not boundaries:
+            return DialogResult(dialog.id, dialog.name)
+
+        def finish(user_id: int, clean: bool):
+            store.mark_done(jobs[user_id], dialog.id)
+            if clean:
+                # Неудалённая пачка не должна оказаться ниже отметки — иначе её больше не найти
+                snapshot.record(jobs[user_id], dialog.id, top_message_id(dialog))
+
+        deleted = 0
+        if fast_path(dialog):
+            for user_id in list(boundaries):
+                try:
+                    removed = await delete_participant_history(client, entity, user_id)
+                except errors.FloodWaitError:
+                    # Флуд — не повод для дорогого обхода по сообщениям: диалог повторит run_dialog_workers
+                    raise
+                except errors.RPCError as e:
+                    # Права могли отобрать после загрузки диалогов — дочищаем по сообщениям
+                    log.warning(f"[PURGE] ⚠️ '{dialog.name}': серверное удаление истории не удалось ({e}), "
+                                f"удаляю по сообщениям")
+                    break
+                found_per_user[user_id] += removed
+                deleted += removed
+                server_side.add(dialog.id)
+                finish(user_id, True)
+                del boundaries[user_id]
+            if not boundaries:
+                return DialogResult(dialog.id, dialog.name, deleted=deleted)
 
-    print(f"[PURGE] ✅ Зачистка для '{user_name}' завершена. Удалено сообщений: {total_deleted_count}")
+        owners: Dict[int, int] = {}  # ID сообщения в конвейере → отправитель
+        failed = False
+
+        def take(msg, user_id: int) -> int:
+            found_per_user[user_id] += 1
+            if not plan_out:
+                owners[msg.id] = user_id
+            return msg.id
+
+        async def matching_ids():
+            # От старых к новым: граница = наибольший уже обработанный ID
+            if prefer_history_scan(dialog, boundaries):
+                # Один проход по истории, отправитель сверяется на месте
+                messages = client.iter_messages(entity, min_id=min(boundaries.values()), reverse=True)
+                async for msg in limiter.iterate(messages):
+                    if msg.id > boundaries.get(msg.sender_id, msg.id):
+                        yield take(msg, msg.sender_id)
+                return
+            for user_id, boundary in boundaries.items():
+                messages = client.iter_messages(entity, from_user=user_id, min_id=boundary, reverse=True)
+                async for msg in limiter.iterate(messages):
+                    yield take(msg, user_id)
+
+        if plan_out:
+            await write_plan_ids(plan_out, dialog.id, matching_ids())
+            return DialogResult(dialog.id, dialog.name)
+
+        def on_chunk_done(chunk: List[int], deleted: int):
+            nonlocal failed
+            failed = failed or deleted < len(chunk)
+            top: Dict[int, int] = {}
+            for msg_id in chunk:
+                user_id = owners.pop(msg_id)
+                top[user_id] = max(top.get(user_id, 0), msg_id)
+            if deleted:
+                for user_id, boundary in top.items():
+                    store.advance(jobs[user_id], dialog.id, boundary)
+
+        deleted += await stream_delete_for_me(client, entity, matching_ids(), on_chunk_done)
+        for user_id in boundaries:
+            finish(user_id, not failed)
+        return DialogResult(dialog.id, dialog.name, deleted=deleted)
+
+    progress = ProgressLog(log, "PURGE")
+    results = await run_dialog_workers(
+        plan.iter_dialogs() if plan else iter_purgeable_dialogs(client), worker, config['PURGE_CONCURRENCY'],
+        on_result=make_progress_printer(progress)
+    )
+    progress.finish()
+
+    total_deleted_count = sum(r.deleted for r in results)
+    print_unchanged(unchanged, "PURGE")
+    if plan_out:
+        for user_id, user_name in users_map.items():
+            log.info(f"[PURGE] 👤 '{user_name}': в план записано {found_per_user[user_id]}")
+        return results
+    finish_checkpoint_jobs(store, jobs.values(), results, "PURGE")
+    if server_side:
+        log.info(f"[PURGE] ⚡ Очищено на стороне сервера (мы админ): диалогов {len(server_side)}")
+    for user_id, user_name in users_map.items():
+        log.info(f"[PURGE] 👤 '{user_name}': найдено сообщений {found_per_user[user_id]}")
+    log.info(f"[PURGE] ✅ Зачистка завершена. Удалено сообщений: {total_deleted_count}")
     await send_to_saved(
         client,
-        f"✅ Зачистка завершена: удалено **{total_deleted_count}** сообщений от *{user_name}*.",
+        f"✅ Зачистка завершена: удалено **{total_deleted_count}** сообщений от *{names}*.",
         keep=False
     )
+    return results
 
 
-async def purge_own_messages_everywhere(client: TelegramClient, me_id: int, exclusion_map: Dict[int, str]):
+async def purge_user_everywhere(client: TelegramClient, user_id: int, user_name: str) -> List[DialogResult]:
+    """Удаляет все сообщения пользователя во всех ЛС и группах (каналы игнорируются)."""
+    return await purge_users_everywhere(client, {user_id: user_name})
+
+
+async def purge_own_messages_everywhere(client: TelegramClient, me_id: int, exclusion_map: Dict[int, str],
+                                        plan_out: Optional[PlanFileWriter] = None) -> List[DialogResult]:
     """
     Удаляет все собственные сообщения во всех чатах,
     кроме тех, что с пользователями из списка исключений.
+    С plan_out только записывает найденные сообщения в файл плана.
     """
-    from .utils import is_personal, is_group
-    
-    print(f"[SELF-PURGE] ⚠️  Начинаю самоочистку всех сообщений...")
-    print(f"[SELF-PURGE] 🔒 Исключения ({len(exclusion_map)}): {list(exclusion_map.values())}")
-    
-    total_deleted_count = 0
-    dialog_count = 0
-    excluded_dialogs = 0
-    
-    try:
-        async for dialog in client.iter_dialogs():
-            entity = dialog.entity
-            
-            # Сканим только ЛС и группы (ни одного канала)
-            if not (is_personal(entity) or is_group(entity)):
-                continue
-                
-            dialog_count += 1
-            
-            # Проверяем, не в списке ли исключений этот чат
-            should_exclude = False
-            
-            if is_personal(entity):
-                # Личный чат - проверяем ID пользователя
-                if entity.id in exclusion_map:
-                    should_exclude = True
-                    excluded_dialogs += 1
-                    print(f"[SELF-PURGE] 🔒 Пропускаю ЛС с {exclusion_map[entity.id]}")
-            
-            if should_exclude:
-                continue
-            
-            print(f"\r[SELF-PURGE] ⚙️ Проверяю диалог {dialog_count}: {dialog.name}", end="")
-            
-            ids_to_delete: List[int] = []
-            try:
-                # Находим все сообщения от меня
-                async for msg in client.iter_messages(entity, from_user=me_id):
-                    # Пропускаем оповещения в Избранном
-                    if entity.id == me_id:  # Избранное
-                        config = get_config()
-                        text = msg.raw_text or ""
-                        if is_alert_message_text(text, config['ALERT_PREFIX']):
-                            continue
-                    
-                    ids_to_delete.append(msg.id)
-                
-                if ids_to_delete:
-                    deleted_in_chat = await delete_ids_for_me(client, entity, ids_to_delete)
-                    total_deleted_count += deleted_in_chat
-                    
-            except Exception as e:
-                # Некоторые чаты могут быть недоступны, это не критично
-                print(f"\n[SELF-PURGE] ⚠️  Ошибка в диалоге '{dialog.name}': {e}")
-                pass
-                
-    finally:
-        print()  # Перевод строки после завершения цикла
-    
-    print(f"[SELF-PURGE] ✅ Самоочистка завершена!")
-    print(f"[SELF-PURGE] 📈 Обработано диалогов: {dialog_count}")
-    print(f"[SELF-PURGE] 🔒 Пропущено (исключения): {excluded_dialogs}")
-    print(f"[SELF-PURGE] 🗑️ Удалено сообщений: {total_deleted_count}")
-    
+    from .utils import is_personal
+
+    config = get_config()
+    if plan_out:
+        log.info(f"[SELF-PURGE] ⏳ Сканирую собственные сообщения в план {plan_out.path} "
+                 f"(параллельно: {config['PURGE_CONCURRENCY']})...")
+    else:
+        log.warning(f"[SELF-PURGE] ⚠️  Начинаю самоочистку всех сообщений "
+                    f"(параллельно: {config['PURGE_CONCURRENCY']})...")
+    log.info(f"[SELF-PURGE] 🔒 Исключения ({len(exclusion_map)}): {list(exclusion_map.values())}")
+    limiter = get_rate_limiter(client)
+    store = get_checkpoint_store()
+    snapshot = get_dialog_snapshot()
+    unchanged: Set[int] = set()
+    job = f"self:{me_id}"
+    resumed_dialogs = store.done_count(job)
+    if resumed_dialogs:
+        log.info(f"[SELF-PURGE] ♻️ Продолжаю прерванную самоочистку: уже завершено диалогов {resumed_dialogs}")
+
+    excluded: Set[int] = set()
+
+    def pending(dialog) -> Dict[int, int]:
+        """{me_id: граница}, если диалог ещё не пройден и не в исключениях."""
+        entity = dialog.entity
+        # Личный чат с пользователем из списка исключений — не трогаем
+        if is_personal(entity) and entity.id in exclusion_map:
+            if dialog.id not in excluded:
+                excluded.add(dialog.id)
+                log.debug(f"[SELF-PURGE] 🔒 Пропускаю ЛС с {exclusion_map[entity.id]}")
+            return {}
+        watermark = incremental_watermark(snapshot, job, dialog)
+        if watermark is None:
+            unchanged.add(dialog.id)
+            return {}
+        boundary, done = store.get(job, dialog.id)
+        return {} if done else {me_id: max(boundary, watermark)}
+
+    plan = await plan_purge(client, iter_purgeable_dialogs(client), pending, "SELF-PURGE") if config['PURGE_PLAN'] else None
+    if plan and not plan_out:
+        for dialog, _ in plan.cleared:
+            snapshot.record(job, dialog.id, top_message_id(dialog))
+
+    async def worker(dialog) -> DialogResult:
+        entity = dialog.entity
+        boundaries = plan.pending_for(dialog) if plan else pending(dialog)
+        if not boundaries:
+            return DialogResult(dialog.id, dialog.name)
+        boundary = boundaries[me_id]
+
+        async def own_ids():
+            # Находим все сообщения от меня: от старых к новым, выше сохранённой границы
+            messages = client.iter_messages(entity, from_user=me_id, min_id=boundary, reverse=True)
+            async for msg in limiter.iterate(messages):
+                # Пропускаем оповещения в Избранном
+                if entity.id == me_id:  # Избранное
+                    text = msg.raw_text or ""
+                    if is_alert_message_text(text, config['ALERT_PREFIX']):
+                        continue
+                yield msg.id
+
+        if plan_out:
+            await write_plan_ids(plan_out, dialog.id, own_ids())
+            return DialogResult(dialog.id, dialog.name)
+
+        failed = False
+
+        def on_chunk_done(chunk: List[int], deleted: int):
+            nonlocal failed
+            failed = failed or deleted < len(chunk)
+            if deleted:
+                store.advance(job, dialog.id, max(chunk))
+
+        deleted = await stream_delete_for_me(client, entity, own_ids(), on_chunk_done)
+        store.mark_done(job, dialog.id)
+        if not failed:
+            snapshot.record(job, dialog.id, top_message_id(dialog))
+        return DialogResult(dialog.id, dialog.name, deleted=deleted)
+
+    progress = ProgressLog(log, "SELF-PURGE")
+    results = await run_dialog_workers(
+        plan.iter_dialogs() if plan else iter_purgeable_dialogs(client), worker, config['PURGE_CONCURRENCY'],
+        on_result=make_progress_printer(progress)
+    )
+    progress.finish()
+
+    dialog_count = plan.scanned if plan else len(results)
+    excluded_dialogs = len(excluded)
+    failed_dialogs = sum(1 for r in results if r.error)
+    total_deleted_count = sum(r.deleted for r in results)
+    print_unchanged(unchanged, "SELF-PURGE")
+    if plan_out:
+        return results
+    finish_checkpoint_jobs(store, [job], results, "SELF-PURGE")
+
+    log.info(f"[SELF-PURGE] ✅ Самоочистка завершена!")
+    log.info(f"[SELF-PURGE] 📈 Обработано диалогов: {dialog_count}")
+    log.info(f"[SELF-PURGE] 🔒 Пропущено (исключения): {excluded_dialogs}")
+    log.info(f"[SELF-PURGE] ⚠️  Диалогов с ошибками: {failed_dialogs}")
+    log.info(f"[SELF-PURGE] 🗑️ Удалено сообщений: {total_deleted_count}")
+
     await send_to_saved(
         client,
         f"✅ **Самоочистка завершена!**\n\n"
@@ -180,6 +493,84 @@ async def purge_own_messages_everywhere(client: TelegramClient, me_id: int, excl
         f"🗝 **Удалено сообщений:** **{total_deleted_count}**",
         keep=True
     )
+    return results
+
+
+async def purge_from_plan_file(client: TelegramClient, path: str, limit: int = 0) -> int:
+    """
+    Фаза удаления: читает файл плана (mmap) и удаляет сообщения пачками по
+    DELETE_CHUNK через общий лимитер. Номер последней выполненной записи
+    хранится в контрольных точках, поэтому план можно выполнять частями:
+    limit > 0 — удалить не больше стольких сообщений за запуск, следующий
+    запуск продолжит с того же места. Возвращает число удалённых сообщений.
+    """
+    plan_file = PlanFile(path)
+    try:
+        if plan_file.account and account_id(client) and plan_file.account != account_id(client):
+            log.error(f"[PLAN] ❌ План {path} составлен для аккаунта {plan_file.account}, "
+                      f"а запущен {account_id(client)} — пропускаю")
+            return 0
+
+        config = get_config()
+        store = get_checkpoint_store()
+        # Привязка к времени создания: пересозданный под тем же именем план выполняется с начала
+        job = f"plan:{os.path.abspath(path)}:{plan_file.created}"
+        position, done = store.get(job, 0)
+        if done or position >= plan_file.count:
+            log.info(f"[PLAN] ✅ План {path} уже выполнен ({plan_file.count} сообщ.)")
+            return 0
+        stop = min(plan_file.count, position + limit) if limit > 0 else plan_file.count
+        log.info(f"[PLAN] ⏳ Выполняю план {path}: записи {position}–{stop} из {plan_file.count}")
+
+        limiter = get_rate_limiter(client)
+        entities: Dict[int, object] = {}
+        dialogs_loaded = False
+
+        async def entity_for(peer_id: int):
+            nonlocal dialogs_loaded
+            if peer_id not in entities:
+                try:
+                    entities[peer_id] = await limiter.call(lambda: client.get_input_entity(peer_id), lane=LANE_BULK)
+                except ValueError:
+                    # Сущности нет в сессии (план с другой машины) — один раз берём её из списка диалогов
+                    if not dialogs_loaded:
+                        dialogs_loaded = True
+                        async for dialog in limiter.iterate(client.iter_dialogs()):
+                            entities.setdefault(dialog.id, dialog.entity)
+                    if peer_id not in entities:
+                        log.warning(f"[PLAN] ⚠️ Диалог {peer_id} не найден, его сообщения пропущены")
+                        entities[peer_id] = None
+            return entities[peer_id]
+
+        progress = ProgressLog(log, "PLAN", unit="сообщений")
+        deleted = 0
+        for peer_id, position, ids in plan_file.batches(position, config['DELETE_CHUNK']):
+            if position > stop:
+                ids = ids[:len(ids) - (position - stop)]
+                position = stop
+            entity = await entity_for(peer_id)
+            if entity is not None:
+                deleted += await delete_chunk_for_me(client, entity, ids)
+            store.advance(job, 0, position)
+            progress.step(str(peer_id), len(ids))
+            if position >= stop:
+                break
+        progress.finish()
+    finally:
+        plan_file.close()
+
+    if stop >= plan_file.count:
+        store.mark_done(job, 0)
+        log.info(f"[PLAN] ✅ План выполнен. Удалено сообщений: {deleted}")
+    else:
+        log.info(f"[PLAN] ⏸️ Удалено сообщений: {deleted}; выполнено {stop} из {plan_file.count}, "
+                 f"следующий запуск продолжит отсюда")
+    await send_to_saved(
+        client,
+        f"✅ План зачистки: удалено **{deleted}** сообщений, выполнено {stop} из {plan_file.count}.",
+        keep=False
+    )
+    return deleted
 
 
 def setup_saved_messages_auto_delete(client: TelegramClient, me_id: int):
@@ -201,11 +592,7 @@ def setup_saved_messages_auto_delete(client: TelegramClient, me_id: int):
             if is_alert_message_text(text, config['ALERT_PREFIX']):
                 # Оповещения — оставляем
                 return
-            # Удаляем через задержку
-            asyncio.create_task(
-                schedule_delete_message(
-                    client, "me", [event.id], config['DELETE_SAVED_DELAY_SECONDS']
-                )
-            )
+            # Удаляем через задержку (пачкой вместе с соседями по слоту)
+            get_auto_delete_wheel(client).schedule(event.id, config['DELETE_SAVED_DELAY_SECONDS'])
         except Exception:
             pass
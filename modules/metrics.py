@@ -0,0 +1,232 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from telethon import TelegramClient, errors
+
+from .accounts import account_label
+from .config_manager import get_config
+
+log = logging.getLogger(__name__)
+
+# Границы корзин гистограмм (секунды)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как в Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Счётчики, гистограммы и датчики (gauge) в памяти процесса.
+    Обновление — словарная операция без блокировок и ввода-вывода, так что
+    метрики можно дёргать прямо из обработчиков и лимитера.
+    """
+
+    def __init__(self):
+        self.help: Dict[str, Tuple[str, str]] = {}  # имя → (тип, описание)
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.gauges: Dict[str, Dict[Labels, Callable[[], float]]] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, kind: str, text: str):
+        self.help.setdefault(name, (kind, text))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def gauge(self, name: str, text: str, read: Callable[[], float], **labels):
+        """Датчик, значение которого читается в момент выгрузки (например, глубина очереди)."""
+        self.describe(name, 'gauge', text)
+        self.gauges.setdefault(name, {})[_labels(labels)] = read
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+
+        def header(name: str, default_kind: str):
+            kind, text = self.help.get(name, (default_kind, name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self.counters.items()):
+            header(name, 'counter')
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, series in sorted(self.histograms.items()):
+            header(name, 'histogram')
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, series in sorted(self.gauges.items()):
+            header(name, 'gauge')
+            for labels, read in sorted(series.items(), key=lambda item: item[0]):
+                try:
+                    value = read()
+                except Exception:
+                    continue
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+_metrics: Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    """Общий на процесс реестр метрик."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+        _metrics.describe('tg_guard_rpc_total', 'counter', "Запросы к API по методам и исходу")
+        _metrics.describe('tg_guard_rpc_seconds', 'histogram', "Время выполнения запроса к API по методам")
+        _metrics.describe('tg_guard_flood_waits_total', 'counter', "Сколько раз пришёл FloodWait")
+        _metrics.describe('tg_guard_flood_wait_seconds_total', 'counter', "Суммарная длительность FloodWait")
+        _metrics.describe('tg_guard_messages_deleted_total', 'counter', "Удалённые сообщения по источнику")
+        _metrics.describe('tg_guard_alert_digests_total', 'counter', "Отправленные сводки несрочных оповещений")
+        _metrics.describe('tg_guard_rate_limit_wait_seconds', 'histogram',
+                          "Ожидание токена лимитера по полосам (live — живые действия, bulk — фон)")
+        _metrics.describe('tg_guard_live_delete_seconds', 'histogram',
+                          "Задержка от получения апдейта до удаления сообщения")
+        _metrics.describe('tg_guard_live_delete_batch_size', 'histogram',
+                          "Размер пачек живых удалений (сообщений в одном запросе)")
+        _metrics.gauge('tg_guard_uptime_seconds', "Время работы процесса", lambda: time.time() - _metrics.started_at)
+    return _metrics
+
+
+def request_name(request) -> str:
+    """Имя метода API для метки: 'DeleteMessagesRequest' → 'DeleteMessages'."""
+    if isinstance(request, (list, tuple)):
+        return request_name(request[0]) if request else "Empty"
+    name = type(request).__name__
+    return name[:-len("Request")] if name.endswith("Request") else name
+
+
+class MeteredTelegramClient(TelegramClient):
+    """
+    TelegramClient, который меряет каждый запрос к API. Все высокоуровневые
+    методы Telethon (iter_messages, delete_messages, get_entity, ...) в итоге
+    вызывают client(request), поэтому учитываются без правок в местах вызова.
+    """
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        metrics = get_metrics()
+        method = request_name(request)
+        account = account_label(self)
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            return await super().__call__(request, ordered=ordered, flood_sleep_threshold=flood_sleep_threshold)
+        except errors.FloodWaitError:
+            outcome = "flood"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.inc('tg_guard_rpc_total', method=method, outcome=outcome, account=account)
+            metrics.observe('tg_guard_rpc_seconds', time.monotonic() - started, method=method, account=account)
+
+
+class _MetricsHandler(asyncio.Protocol):
+    """Минимальный HTTP-ответчик: на любой запрос отдаёт метрики."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b""
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        if b"\r\n\r\n" not in self.buffer and len(self.buffer) < 8192:
+            return
+        body = get_metrics().render().encode()
+        self.transport.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        self.transport.close()
+
+
+def write_metrics_file(path: str):
+    """Атомарно записывает метрики в файл (для textfile-коллектора node_exporter)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(get_metrics().render())
+    os.replace(tmp_path, path)
+
+
+async def start_metrics_exporter():
+    """
+    Включает выгрузку метрик согласно настройкам: HTTP на 127.0.0.1:METRICS_PORT
+    и/или периодическая запись в METRICS_FILE. Если оба выключены — ничего не делает.
+    """
+    config = get_config()
+    if config['METRICS_PORT']:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.create_server(_MetricsHandler, "127.0.0.1", config['METRICS_PORT'])
+            log.info(f"[METRICS] 📈 Метрики: http://127.0.0.1:{config['METRICS_PORT']}/metrics")
+        except OSError as e:
+            log.warning(f"[METRICS] [WARN] Не удалось открыть порт {config['METRICS_PORT']}: {e}")
+
+    if config['METRICS_FILE']:
+        path, interval = config['METRICS_FILE'], config['METRICS_FILE_SECONDS']
+
+        async def write_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    write_metrics_file(path)
+                except OSError as e:
+                    log.warning(f"[METRICS] [WARN] Не удалось записать {path}: {e}")
+
+        asyncio.create_task(write_periodically())
+        log.info(f"[METRICS] 📈 Метрики пишутся в {path} каждые {interval} сек.")
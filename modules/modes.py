@@ -1,34 +1,85 @@
-from typing import Dict
+import logging
+import math
+import os
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Set
 from telethon import TelegramClient, events, errors, functions
+from telethon.tl.types import PeerChannel, User
 from telethon.utils import get_display_name
 
+from .accounts import account_id, account_label, all_accounts
+from .alert_outbox import get_alert_outbox
 from .config_manager import get_config
-from .utils import is_group, is_broadcast_channel, is_personal, is_supergroup, is_basic_group
-from .message_handler import send_to_saved, purge_user_everywhere, purge_own_messages_everywhere
+from .entity_cache import display_name, get_entity_cache
+from .utils import is_group, is_broadcast_channel, is_personal, is_supergroup
+from .message_handler import (
+    send_to_saved, purge_users_everywhere, purge_own_messages_everywhere, purge_from_plan_file
+)
+from .live_delete import get_deletion_aggregator
+from .live_lists import get_live_lists
+from .membership_index import get_membership_index
+from .plan_file import PlanFileWriter
+from .rate_limiter import LANE_LIVE, get_rate_limiter
 
+log = logging.getLogger(__name__)
 
-async def mode_tracked_scanning(client: TelegramClient, tracked_map: Dict[int, str]):
-    """Режим 1: Только сканирование присутствия TRACKED пользователей."""
-    print("\n🔍 Режим: Сканирование присутствия TRACKED пользователей")
-    print("="*50)
-    
-    if not tracked_map:
-        print("⚠️ Список TRACKED пуст. Нечего отслеживать.")
-        return
-    
+# Столько участников Telegram отдаёт за одну страницу GetParticipants
+PARTICIPANTS_PAGE = 200
+
+
+def register_mode_handlers(client: TelegramClient, selected_mode: int):
+    """
+    Регистрирует все обработчики событий режимов 1–4. Вызывается синхронно,
+    до выгрузки EXPORT_GROUP, резолва списков и начального прохода: события
+    ловятся с момента входа, а обработчики сверяются с живыми списками,
+    которые дозаполнятся по ходу загрузки.
+    """
+    if selected_mode in (1, 4):
+        register_tracked_handlers(client)
+    if selected_mode in (2, 3, 4):
+        register_blacklist_handlers(client)
+    if selected_mode in (2, 4):
+        register_blacklist_purge_listener(client)
+
+
+def register_tracked_handlers(client: TelegramClient):
+    """Обработчики режима 1: индекс участников и оповещения о вступлениях TRACKED."""
     config = get_config()
-    # Регистрируем обработчик для новых вступлений в группы
-    tracked_ids = set(tracked_map.keys())
-    
+    lists = get_live_lists()  # TRACKED читается на каждом событии: список можно перезагрузить на лету
+    index = get_membership_index(client)
+    index.start_autosave(config['MEMBERSHIP_SNAPSHOT_SECONDS'])
+
+    @client.on(events.NewMessage())
+    async def on_any_message(event: events.NewMessage.Event):
+        # Индекс помнит последнее сообщение чата: после перезапуска чат не придётся перепроверять
+        index.touch(event.chat_id, event.id)
+
     @client.on(events.ChatAction)
     async def on_chat_action(event: events.ChatAction.Event):
-        # Нас интересуют только join/add события и только группы
-        if not (event.user_joined or event.user_added):
+        # Поддерживаем индекс участников без запросов к серверу
+        if event.action_message:
+            index.touch(event.chat_id, event.action_message.id)
+        tracked_ids = lists.tracked_ids
+        tracked_in_event = [user_id for user_id in event.user_ids if user_id in tracked_ids]
+        if tracked_in_event:
+            if event.user_joined or event.user_added:
+                index.add_members(event.chat_id, tracked_in_event)
+            elif event.user_left or event.user_kicked:
+                index.remove_members(event.chat_id, tracked_in_event)
+
+        # Оповещаем только о join/add событиях и только в группах
+        if not (event.user_joined or event.user_added) or not tracked_in_event:
             return
-        chat = await event.get_chat()
-        if not is_group(chat):
+        # Запросы за пределами лимитера сами FloodWait не переждут (flood_sleep_threshold=0)
+        limiter = get_rate_limiter(client)
+        try:
+            chat = await limiter.call(event.get_chat, lane=LANE_LIVE)
+            if not is_group(chat):
+                return
+            users = await limiter.call(event.get_users, lane=LANE_LIVE)
+        except errors.RPCError as e:
+            log.error(f"❌ Не удалось получить данные о вступлении в {event.chat_id}: {e}")
             return
-        users = await event.get_users()
         for user in users:
             if user.id in tracked_ids:
                 await send_to_saved(
@@ -36,105 +87,134 @@ async def mode_tracked_scanning(client: TelegramClient, tracked_map: Dict[int, s
                     f"{config['ALERT_PREFIX']}**Обнаружен пользователь!**\n\n"
                     f"**Кто:** `{get_display_name(user)}`\n"
                     f"**Где:** «*{get_display_name(chat)}*»",
-                    keep=True
+                    keep=True,
+                    lane=LANE_LIVE
                 )
-    
-    # Выполняем начальное сканирование
-    await initial_presence_scan(client, tracked_map)
-    print("✅ Режим сканирования активирован. Ожидаю новых вступлений...")
 
 
-async def mode_blacklist_purge_all(client: TelegramClient, blacklist_map: Dict[int, str]):
-    """Режим 2: Удаление ВСЕХ сообщений BLACKLIST пользователей."""
-    print("\n🧹 Режим: Удаление ВСЕХ сообщений BLACKLIST пользователей")
-    print("="*50)
+async def mode_tracked_scanning(client: TelegramClient, tracked_map: Dict[int, str]):
+    """Режим 1: Только сканирование присутствия TRACKED пользователей."""
+    log.info("🔍 Режим: Сканирование присутствия TRACKED пользователей")
+    log.info("="*50)
     
-    if not blacklist_map:
-        print("⚠️ Список BLACKLIST пуст. Нечего удалять.")
+    if not tracked_map:
+        log.warning("⚠️ Список TRACKED пуст. Нечего отслеживать.")
         return
     
-    # Регистрируем обработчики для новых сообщений
-    blacklist_ids = set(blacklist_map.keys())
-    
-    @client.on(events.NewMessage(from_users=list(blacklist_ids), incoming=True))
+    # Выполняем начальное сканирование (обработчики уже зарегистрированы)
+    await initial_presence_scan(client, tracked_map)
+    log.info("✅ Режим сканирования активирован. Ожидаю новых вступлений...")
+
+
+def register_blacklist_handlers(client: TelegramClient):
+    """
+    Обработчики удаления новых и отредактированных сообщений BLACKLIST.
+    Решение принимается только по самому апдейту (тип пира, флаг post,
+    отправитель), без get_chat()/get_sender(). Удаление уходит через
+    агрегатор: одиночное сообщение — сразу, флуд — пачками по чату.
+    Отправитель сверяется с живым списком, поэтому после перезагрузки
+    списков обработчики перерегистрировать не нужно.
+    """
+    aggregator = get_deletion_aggregator(client)
+    lists = get_live_lists()
+
+    def is_blacklisted(event) -> bool:
+        return event.sender_id in lists.blacklist_ids
+
+    def delete_now(event):
+        message = event.message
+        # Посты каналов (broadcast) игнорируем: у них выставлен флаг post.
+        # event.chat — только то, что уже лежит в кэше, запрос в сеть не делается
+        if message.post or (isinstance(message.peer_id, PeerChannel) and is_broadcast_channel(event.chat)):
+            return
+        aggregator.add(event.chat_id, event.input_chat or message.peer_id, message.id, event)
+
+    @client.on(events.NewMessage(incoming=True, func=is_blacklisted))
     async def on_blacklisted_incoming(event: events.NewMessage.Event):
-        try:
-            chat = await event.get_chat()
-            # Игнорируем каналы
-            if is_broadcast_channel(chat):
-                return
-            await event.delete(revoke=False)
-            print(f"🚫 Удалено новое сообщение от {get_display_name(await event.get_sender())}")
-        except Exception as e:
-            print(f"❌ Ошибка при удалении сообщения: {e}")
+        delete_now(event)
 
-    @client.on(events.MessageEdited(from_users=list(blacklist_ids)))
+    @client.on(events.MessageEdited(func=is_blacklisted))
     async def on_blacklisted_edited(event: events.MessageEdited.Event):
-        try:
-            chat = await event.get_chat()
-            if is_broadcast_channel(chat):
-                return
-            await event.delete(revoke=False)
-            print(f"🚫 Удалено отредактированное сообщение от {get_display_name(await event.get_sender())}")
-        except Exception as e:
-            print(f"❌ Ошибка при удалении отредактированного сообщения: {e}")
-    
-    # Выполняем начальную зачистку всех существующих сообщений
-    print("🧹 Начинаю зачистку всех существующих сообщений...")
-    for user_id, user_name in blacklist_map.items():
-        await purge_user_everywhere(client, user_id, user_name)
+        delete_now(event)
+
+
+def register_blacklist_purge_listener(client: TelegramClient):
+    """Пользователей, добавленных в BLACKLIST на лету, тоже зачищаем по всей истории."""
+    def on_lists_changed(name: str, added: Dict[int, str], removed: Dict[int, str]):
+        if name == 'blacklist' and added:
+            return purge_users_everywhere(client, added)
+
+    get_live_lists().on_change(on_lists_changed)
+
+
+def plan_path(client: TelegramClient, path: str) -> str:
+    """Файл плана аккаунта: при нескольких аккаунтах к имени добавляется сессия."""
+    return f"{path}.{account_label(client)}" if len(all_accounts()) > 1 else path
+
+
+async def write_purge_plan(client: TelegramClient, scan: Callable[[PlanFileWriter], Awaitable]):
+    """Фаза сканирования двухфазной зачистки: scan(writer) пишет найденные сообщения в PLAN_FILE_OUT."""
+    path = plan_path(client, get_config()['PLAN_FILE_OUT'])
+    with PlanFileWriter(path, account_id(client)) as writer:
+        await scan(writer)
+    log.info(f"📝 План записан в {path}: {writer.count} сообщ. ({os.path.getsize(path) / 1024:.1f} КБ)")
+    log.info(f"💡 Просмотр: python -m modules.plan_file show {path}; удаление: --plan-in {path}")
+
+
+async def mode_blacklist_purge_all(client: TelegramClient, blacklist_map: Dict[int, str],
+                                   plan_phase: bool = False):
+    """
+    Режим 2: Удаление ВСЕХ сообщений BLACKLIST пользователей.
+    plan_phase=True (режим 2 выбран явно и задан PLAN_FILE_OUT / PLAN_FILE_IN) —
+    выполняется только одна фаза двухфазной зачистки (запись плана или удаление
+    по нему), новые сообщения не отслеживаются. Комбинированный режим файлы
+    плана не использует.
+    """
+    log.info("🧹 Режим: Удаление ВСЕХ сообщений BLACKLIST пользователей")
+    log.info("="*50)
+    config = get_config()
+
+    if plan_phase and config['PLAN_FILE_IN']:
+        await purge_from_plan_file(client, plan_path(client, config['PLAN_FILE_IN']), config['PLAN_FILE_LIMIT'])
+        return
+
+    if not blacklist_map:
+        log.warning("⚠️ Список BLACKLIST пуст. Нечего удалять.")
+        return
+
+    if plan_phase and config['PLAN_FILE_OUT']:
+        await write_purge_plan(client, lambda writer: purge_users_everywhere(client, blacklist_map, plan_out=writer))
+        return
+
+    # Выполняем начальную зачистку всех существующих сообщений (новые уже удаляют обработчики)
+    log.info("🧹 Начинаю зачистку всех существующих сообщений...")
+    await purge_users_everywhere(client, blacklist_map)
     
-    print("✅ Режим полной зачистки активирован. Удаляю новые сообщения...")
+    log.info("✅ Режим полной зачистки активирован. Удаляю новые сообщения...")
 
 
 async def mode_blacklist_new_only(client: TelegramClient, blacklist_map: Dict[int, str]):
     """Режим 3: Удаление только НОВЫХ сообщений BLACKLIST пользователей."""
-    print("\n🚫 Режим: Удаление только НОВЫХ сообщений BLACKLIST пользователей")
-    print("="*50)
+    log.info("🚫 Режим: Удаление только НОВЫХ сообщений BLACKLIST пользователей")
+    log.info("="*50)
     
     if not blacklist_map:
-        print("⚠️ Список BLACKLIST пуст. Нечего удалять.")
+        log.warning("⚠️ Список BLACKLIST пуст. Нечего удалять.")
         return
     
-    # Регистрируем обработчики только для новых сообщений
-    blacklist_ids = set(blacklist_map.keys())
-    
-    @client.on(events.NewMessage(from_users=list(blacklist_ids), incoming=True))
-    async def on_blacklisted_incoming(event: events.NewMessage.Event):
-        try:
-            chat = await event.get_chat()
-            # Игнорируем каналы
-            if is_broadcast_channel(chat):
-                return
-            await event.delete(revoke=False)
-            sender = await event.get_sender()
-            chat_name = get_display_name(chat)
-            print(f"🚫 Удалено новое сообщение от {get_display_name(sender)} в {chat_name}")
-        except Exception as e:
-            print(f"❌ Ошибка при удалении сообщения: {e}")
-
-    @client.on(events.MessageEdited(from_users=list(blacklist_ids)))
-    async def on_blacklisted_edited(event: events.MessageEdited.Event):
-        try:
-            chat = await event.get_chat()
-            if is_broadcast_channel(chat):
-                return
-            await event.delete(revoke=False)
-            sender = await event.get_sender()
-            chat_name = get_display_name(chat)
-            print(f"🚫 Удалено отредактированное сообщение от {get_display_name(sender)} в {chat_name}")
-        except Exception as e:
-            print(f"❌ Ошибка при удалении отредактированного сообщения: {e}")
-    
-    print("✅ Режим удаления новых сообщений активирован. Исторические сообщения не затрагиваются.")
+    # Исторические сообщения не трогаем: новые удаляют обработчики register_blacklist_handlers
+    log.info("✅ Режим удаления новых сообщений активирован. Исторические сообщения не затрагиваются.")
 
 
 async def mode_combined(client: TelegramClient, tracked_map: Dict[int, str], blacklist_map: Dict[int, str]):
-    """Режим 4: Комбинированный режим - все функции."""
-    print("\n🔄 Режим: Комбинированный (все функции)")
-    print("="*50)
+    """
+    Режим 4: Комбинированный режим - все функции. Обработчики обоих режимов
+    зарегистрированы заранее (register_mode_handlers), поэтому новые сообщения
+    BLACKLIST удаляются и во время начального сканирования присутствия.
+    """
+    log.info("🔄 Режим: Комбинированный (все функции)")
+    log.info("="*50)
     
-    # Запускаем все режимы одновременно
     if tracked_map:
         await mode_tracked_scanning(client, tracked_map)
     
@@ -142,7 +222,90 @@ async def mode_combined(client: TelegramClient, tracked_map: Dict[int, str], bla
         # В комбинированном режиме используем полную зачистку
         await mode_blacklist_purge_all(client, blacklist_map)
     
-    print("✅ Комбинированный режим активирован. Все функции работают одновременно.")
+    log.info("✅ Комбинированный режим активирован. Все функции работают одновременно.")
+
+
+async def find_tracked_in_supergroup(
+    client: TelegramClient, entity, chat_name: str, tracked_map: Dict[int, str], stats: Counter
+) -> Set[int]:
+    """
+    Возвращает ID отслеживаемых, которые состоят в супергруппе. Стратегия
+    выбирается по стоимости в RPC: T точечных GetParticipant против
+    ceil(N / PAGE) страниц выгрузки участников (T — отслеживаемых, N — участников).
+    Решение и число запросов пишутся в лог, чтобы можно было подобрать пороги.
+    """
+    config = get_config()
+    limiter = get_rate_limiter(client)
+    tracked_count = len(tracked_map)
+
+    strategy = "lookup"
+    participants_count = getattr(entity, 'participants_count', None)
+    if tracked_count > config['PRESENCE_LOOKUP_MAX']:
+        if participants_count is None:
+            try:
+                participants_count = (await limiter.call(lambda: client.get_participants(entity, limit=0))).total
+            except Exception as e:
+                log.warning(f"[SCAN] ⚠️ «{chat_name}»: не удалось узнать число участников: {e}")
+                stats['errors'] += 1
+            stats['count_rpc'] += 1
+        if participants_count is not None and participants_count <= config['PRESENCE_LISTING_MAX']:
+            listing_cost = math.ceil(participants_count / PARTICIPANTS_PAGE) * config['PRESENCE_LISTING_COST']
+            if listing_cost < tracked_count:
+                strategy = "listing"
+
+    found: Set[int] = set()
+    if strategy == "listing":
+        seen = 0
+        try:
+            async for user in limiter.iterate(client.iter_participants(entity), page_size=PARTICIPANTS_PAGE):
+                seen += 1
+                if user.id in tracked_map:
+                    found.add(user.id)
+                    if len(found) == tracked_count:
+                        break
+        except Exception as e:
+            # Список участников бывает скрыт — тогда остаются точечные запросы
+            log.warning(f"[SCAN] ⚠️ «{chat_name}»: выгрузка участников недоступна ({e}), перехожу на точечные запросы")
+            stats['errors'] += 1
+            strategy = "lookup"
+        rpc = math.ceil(seen / PARTICIPANTS_PAGE) or 1
+        stats['listing_rpc'] += rpc
+
+    if strategy == "lookup":
+        rpc = 0
+        for user_id in tracked_map:
+            rpc += 1
+            try:
+                await limiter.call(lambda: client(functions.channels.GetParticipantRequest(
+                    channel=entity,
+                    participant=user_id
+                )))
+                found.add(user_id)
+            except errors.UserNotParticipantError:
+                pass
+            except Exception as e:
+                log.warning(f"[SCAN] ⚠️ «{chat_name}»: ошибка проверки участника {user_id}: {e}")
+                stats['errors'] += 1
+        stats['lookup_rpc'] += rpc
+
+    stats[f"{strategy}_chats"] += 1
+    log.debug(f"[SCAN] 📐 «{chat_name}»: участников {participants_count if participants_count is not None else '?'}, "
+              f"отслеживаемых {tracked_count} → {strategy}, RPC: {rpc}")
+    return found
+
+
+async def find_tracked_in_basic_group(
+    client: TelegramClient, entity, chat_name: str, tracked_map: Dict[int, str], stats: Counter
+) -> Set[int]:
+    """Возвращает ID отслеживаемых в обычной группе (её участники помещаются в один запрос)."""
+    try:
+        participants = await get_rate_limiter(client).call(lambda: client.get_participants(entity))
+    except Exception as e:
+        # нет прав или группа недоступна
+        log.warning(f"[SCAN] ⚠️ «{chat_name}»: не удалось получить участников: {e}")
+        stats['errors'] += 1
+        return set()
+    return {p.id for p in participants if isinstance(p, User) and p.id in tracked_map}
 
 
 async def initial_presence_scan(client: TelegramClient, tracked_map: Dict[int, str]):
@@ -151,114 +314,163 @@ async def initial_presence_scan(client: TelegramClient, tracked_map: Dict[int, s
     - Личные диалоги (DM)
     - Группы и супергруппы
     Каналы (broadcast) игнорируются.
+    Находки уходят в 'Избранное' сводками (ALERT_DIGEST_SECONDS), а не по сообщению на каждую.
     """
     if not tracked_map:
         return
 
-    print("[SCAN] 🕵️ Проверяю текущее присутствие отслеживаемых пользователей (ЛС и группы)...")
+    log.info("[SCAN] 🕵️ Проверяю текущее присутствие отслеживаемых пользователей (ЛС и группы)...")
     found_count = 0
+    limiter = get_rate_limiter(client)
+    scan_stats = Counter()
+    outbox = get_alert_outbox(client)
+    index = get_membership_index(client)
+    if index.ensure_tracked(tracked_map):
+        log.info("[SCAN] 🗂️ Список отслеживаемых изменился — индекс участников строится заново")
+    seen_chats = set()
 
-    async for dialog in client.iter_dialogs():
+    async for dialog in limiter.iterate(client.iter_dialogs()):
         entity = dialog.entity
 
         # 1) ЛС
         if is_personal(entity):
             user_id = entity.id
             if user_id in tracked_map:
-                user_name = tracked_map[user_id]
-                message = f"ℹ️ **Уже в личном диалоге:** `{user_name}`"
-                await send_to_saved(client, message, keep=False)
+                outbox.add(f"👤 `{tracked_map[user_id]}` — уже в личном диалоге")
                 found_count += 1
             continue
 
         # 2) Группы и супергруппы
         if is_group(entity):
-            # Супергруппа — быстрый запрос участника
-            if is_supergroup(entity):
-                for user_id, user_name in tracked_map.items():
-                    try:
-                        await client(functions.channels.GetParticipantRequest(
-                            channel=entity,
-                            participant=user_id
-                        ))
-                        msg = f"ℹ️ **Уже в группе:** `{user_name}` состоит в чате «*{dialog.name}*»"
-                        await send_to_saved(client, msg, keep=False)
-                        found_count += 1
-                    except errors.UserNotParticipantError:
-                        pass
-                    except Exception:
-                        pass
-                continue
+            seen_chats.add(dialog.id)
+            top_message = dialog.message.id if dialog.message else 0
+            errors_before = scan_stats['errors']
+            if index.is_fresh(dialog.id, top_message):
+                # Чат не менялся с прошлой проверки — отвечаем из индекса без запросов
+                found_ids = index.members_of(dialog.id)
+                scan_stats['index_chats'] += 1
+            elif is_supergroup(entity):
+                # Супергруппа — точечные запросы или выгрузка участников, что дешевле
+                found_ids = await find_tracked_in_supergroup(client, entity, dialog.name, tracked_map, scan_stats)
+            else:
+                # Обычная группа — проверяем список участников (для небольших чатов)
+                found_ids = await find_tracked_in_basic_group(client, entity, dialog.name, tracked_map, scan_stats)
+            if scan_stats['errors'] == errors_before:
+                index.set_chat(dialog.id, found_ids, top_message)
 
-            # Обычная группа — проверяем список участников (для небольших чатов)
-            if is_basic_group(entity):
-                try:
-                    participants = await client.get_participants(entity)
-                    from telethon.tl.types import User
-                    ids = {p.id for p in participants if isinstance(p, User)}
-                    for user_id in list(tracked_map.keys()):
-                        if user_id in ids:
-                            user_name = tracked_map[user_id]
-                            msg = f"ℹ️ **Уже в группе:** `{user_name}` состоит в чате «*{dialog.name}*»"
-                            await send_to_saved(client, msg, keep=False)
-                            found_count += 1
-                except Exception:
-                    # нет прав или группа недоступна
-                    pass
+            for user_id in found_ids:
+                outbox.add(f"👥 `{tracked_map[user_id]}` — уже в чате «*{dialog.name}*»")
+                found_count += 1
 
         # 3) Каналы игнорируем полностью
         # if is_broadcast_channel(entity): continue
 
-    print(f"[SCAN] ✅ Проверка завершена. Найдено совпадений: {found_count}.")
+    index.forget_missing(seen_chats)
+    index.save()
+    await outbox.flush()
 
+    log.info(f"[SCAN] ✅ Проверка завершена. Найдено совпадений: {found_count}.")
+    log.info(f"[SCAN] 🗂️ Чатов взято из индекса без запросов: {scan_stats['index_chats']}")
+    log.info(f"[SCAN] 📊 Супергруппы: точечно {scan_stats['lookup_chats']} чат. / {scan_stats['lookup_rpc']} RPC, "
+             f"выгрузкой {scan_stats['listing_chats']} чат. / {scan_stats['listing_rpc']} RPC, "
+             f"запросов числа участников {scan_stats['count_rpc']}, ошибок {scan_stats['errors']}")
 
-async def mode_self_purge(client: TelegramClient, me_id: int, exclusion_map: Dict[int, str]):
-    """Режим 5: Удаление всех собственных сообщений, кроме исключений."""
-    print("\n🗑️ Режим: Удаление всех собственных сообщений")
-    print("="*50)
-    
-    if not exclusion_map:
+
+async def mode_self_purge(client: TelegramClient, me_id: int, exclusion_map: Dict[int, str],
+                          confirmed: bool = False):
+    """
+    Режим 5: Удаление всех собственных сообщений, кроме исключений.
+    confirmed=True — подтверждение уже дано (флаг --yes или вопрос до запуска
+    аккаунтов, см. run_telegram_client), вопросы не задаются.
+    С PLAN_FILE_OUT сообщения только записываются в план (без подтверждения),
+    с PLAN_FILE_IN — удаляются по ранее записанному плану.
+    """
+    log.info("🗑️ Режим: Удаление всех собственных сообщений")
+    log.info("="*50)
+    config = get_config()
+
+    if config['PLAN_FILE_OUT']:
+        await write_purge_plan(
+            client, lambda writer: purge_own_messages_everywhere(client, me_id, exclusion_map, plan_out=writer)
+        )
+        return
+
+    plan_in = plan_path(client, config['PLAN_FILE_IN']) if config['PLAN_FILE_IN'] else ""
+    if not confirmed and not confirm_self_purge(list(exclusion_map.values()), plan_in, account_label(client)):
+        return
+
+    if plan_in:
+        await purge_from_plan_file(client, plan_in, config['PLAN_FILE_LIMIT'])
+    else:
+        await purge_own_messages_everywhere(client, me_id, exclusion_map)
+
+    log.info("✅ Режим самоочистки завершён.")
+
+
+def confirm_self_purge(exclusions: List[str], plan_in: str = "", account: str = "") -> bool:
+    """
+    Подтверждение самоочистки аккаунта account в терминале
+    (по плану plan_in — без вопроса об исключениях).
+    """
+    target = f" аккаунта {account}" if account else ""
+    if not exclusions and not plan_in:
         print("⚠️ Список исключений пуст. Все сообщения будут удалены!")
-        confirm = input("🚨 Продолжить без исключений? (да/нет): ").strip().lower()
+        confirm = input(f"🚨 Продолжить самоочистку{target} без исключений? (да/нет): ").strip().lower()
         if confirm not in ["да", "yes", "y", "я"]:
             print("❌ Операция отменена")
-            return
+            return False
     
     # Показываем последнее предупреждение
     print(f"\n🚨 ОПАСНОСТЬ! Операция необратима!")
-    print(f"🗑️ Будут удалены ВСЕ ваши сообщения во всех чатах за всё время!")
-    if exclusion_map:
-        print(f"🔒 Исключения ({len(exclusion_map)}): {list(exclusion_map.values())}")
+    if plan_in:
+        print(f"🗑️ Будут удалены сообщения из плана {plan_in}")
+    else:
+        print(f"🗑️ Будут удалены ВСЕ ваши сообщения во всех чатах за всё время!")
+    if exclusions and not plan_in:
+        print(f"🔒 Исключения ({len(exclusions)}): {exclusions}")
     
-    final_confirm = input("\nВведите 'УДАЛИТЬ ВСЁ' для подтверждения: ").strip()
+    final_confirm = input(f"\nВведите 'УДАЛИТЬ ВСЁ' для подтверждения самоочистки{target}: ").strip()
     if final_confirm != "УДАЛИТЬ ВСЁ":
         print("❌ Операция отменена (неверное подтверждение)")
-        return
-    
-    # Запускаем самоочистку
-    await purge_own_messages_everywhere(client, me_id, exclusion_map)
-    
-    print("✅ Режим самоочистки завершён.")
+        return False
+    return True
 
 
-async def get_users_from_group(client: TelegramClient, group_identifier):
-    """Возвращает юзернеймы участников, если это группа/супергруппа (канал игнорируется)."""
+async def get_users_from_group(client: TelegramClient, group_identifier) -> Dict[int, str]:
+    """
+    Потоково выгружает участников группы/супергруппы (канал игнорируется)
+    и возвращает {user_id: display_name} — в том числе тех, у кого нет юзернейма.
+    Сущности сразу попадают в сессию Telethon и в кэш, поэтому повторный
+    резолв по юзернеймам не нужен.
+    """
     if not group_identifier:
-        return set()
+        return {}
 
-    print(f"[EXPORT] ⏳ Загружаю участников из '{group_identifier}'...")
+    log.info(f"[EXPORT] ⏳ Загружаю участников из '{group_identifier}'...")
+    users: Dict[int, str] = {}
     try:
-        group_entity = await client.get_entity(group_identifier)
+        limiter = get_rate_limiter(client)
+        cache = get_entity_cache()
+        account = account_id(client)
+        group_entity = await limiter.call(lambda: client.get_entity(group_identifier))
 
         if is_broadcast_channel(group_entity):
-            print(f"[EXPORT] ℹ️ '{group_identifier}' является каналом. Экспорт участников пропущен.")
-            return set()
-
-        participants = await client.get_participants(group_entity)
-        from telethon.tl.types import User
-        usernames = {f"@{user.username}" for user in participants if isinstance(user, User) and user.username}
-        print(f"[EXPORT] ✅ Найдено {len(usernames)} уникальных пользователей с юзернеймами.")
-        return usernames
+            log.info(f"[EXPORT] ℹ️ '{group_identifier}' является каналом. Экспорт участников пропущен.")
+            return {}
+
+        page = []
+        async for user in limiter.iterate(client.iter_participants(group_entity), PARTICIPANTS_PAGE):
+            if not isinstance(user, User):
+                continue
+            users[user.id] = display_name(user)
+            page.append(user)
+            if len(page) >= PARTICIPANTS_PAGE:
+                cache.put_many(page, account)
+                page = []
+        cache.put_many(page, account)
+        log.info(f"[EXPORT] ✅ Найдено {len(users)} уникальных пользователей.")
+        return users
     except Exception as e:
-        print(f"[ERROR] Не удалось получить участников из '{group_identifier}': {e}")
-        return set()
+        log.error(f"[ERROR] Не удалось получить участников из '{group_identifier}': {e}")
+        # Уже выгруженных участников не теряем
+        return users
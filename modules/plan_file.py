@@ -0,0 +1,156 @@
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+
+# Заголовок: сигнатура, версия, резерв, время создания, аккаунт (ID владельца сессии)
+HEADER = struct.Struct('<8sIIqq')
+MAGIC = b"TGGPLAN1"
+VERSION = 1
+# Запись — два int64: помеченный ID диалога (get_peer_id) и ID сообщения
+RECORD_SIZE = 16
+
+
+def _to_file_order(values: array):
+    # В файле числа всегда little-endian, независимо от платформы
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+
+class PlanFileWriter:
+    """
+    Пишет план зачистки: по записи на сообщение, без хранения плана в памяти.
+    Сообщения одного диалога пишутся сплошными блоками (write_block без
+    await внутри), поэтому параллельные воркеры не перемешивают записи в блоке.
+    Файл пишется во временный и появляется под своим именем только целиком:
+    прерванное сканирование не оставляет «полуготовый» план.
+    """
+
+    def __init__(self, path: str, account: int):
+        self.path = path
+        self.account = account
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, int(time.time()), account))
+
+    def write_block(self, peer_id: int, ids: List[int]):
+        """Дописывает сообщения одного диалога."""
+        if not ids:
+            return
+        values = array('q', [0]) * (2 * len(ids))
+        values[0::2] = array('q', [peer_id]) * len(ids)
+        values[1::2] = array('q', ids)
+        _to_file_order(values)
+        self._file.write(values.tobytes())
+        self.count += len(ids)
+
+    def close(self):
+        """Завершает план и переименовывает временный файл в итоговый."""
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Бросает недописанный план."""
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> 'PlanFileWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class PlanFile:
+    """
+    План зачистки, открытый на чтение через mmap: в память попадают только
+    читаемые сейчас страницы файла, сколько бы сообщений в нём ни было.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path}: файл плана обрезан")
+        magic, version, _, self.created, self.account = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не файл плана TG-Guard (или другая версия формата)")
+        if (len(self._map) - HEADER.size) % RECORD_SIZE:
+            raise ValueError(f"{path}: файл плана обрезан")
+        self.count = (len(self._map) - HEADER.size) // RECORD_SIZE
+
+    def size_bytes(self) -> int:
+        return len(self._map)
+
+    def _values(self, start: int, stop: int) -> array:
+        values = array('q')
+        values.frombytes(self._map[HEADER.size + start * RECORD_SIZE:HEADER.size + stop * RECORD_SIZE])
+        _to_file_order(values)
+        return values
+
+    def batches(self, start: int = 0, max_batch: int = 100,
+                window: int = 64 * 1024) -> Iterator[Tuple[int, int, List[int]]]:
+        """
+        Пачки подряд идущих сообщений одного диалога, начиная с записи start:
+        (ID диалога, номер записи после пачки, ID сообщений). Файл читается
+        окнами по window записей.
+        """
+        peer_id: Optional[int] = None
+        ids: List[int] = []
+        position = start
+        while position < self.count:
+            stop = min(position + window, self.count)
+            values = self._values(position, stop)
+            for i in range(0, len(values), 2):
+                if ids and (values[i] != peer_id or len(ids) >= max_batch):
+                    yield peer_id, position, ids
+                    ids = []
+                peer_id = values[i]
+                ids.append(values[i + 1])
+                position += 1
+        if ids:
+            yield peer_id, position, ids
+
+    def per_peer(self, window: int = 64 * 1024) -> Counter:
+        """Сколько сообщений плана приходится на каждый диалог (считаются только ID диалогов, окнами)."""
+        counts: Counter = Counter()
+        for position in range(0, self.count, window):
+            counts.update(self._values(position, min(position + window, self.count))[0::2])
+        return counts
+
+    def close(self):
+        self._map.close()
+
+
+def main(argv: List[str]):
+    """
+    Просмотр плана перед выполнением:
+        python -m modules.plan_file show plan.bin [сколько диалогов показать]
+    """
+    if len(argv) < 2 or argv[0] != "show":
+        print(main.__doc__)
+        raise SystemExit(2)
+    plan = PlanFile(argv[1])
+    top = int(argv[2]) if len(argv) > 2 else 20
+    counts = plan.per_peer()
+    created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(plan.created))
+    print(f"📝 План {plan.path}: создан {created}, аккаунт {plan.account}")
+    print(f"🗑️ Сообщений: {plan.count} в {len(counts)} диалогах ({plan.size_bytes() / 1024:.1f} КБ)")
+    for peer_id, count in counts.most_common(top):
+        print(f"   {peer_id}: {count}")
+    if len(counts) > top:
+        print(f"   ... и ещё {len(counts) - top} диалогов")
+    plan.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
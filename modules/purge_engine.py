@@ -0,0 +1,65 @@
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from telethon import errors
+
+
+@dataclass
+class DialogResult:
+    """Итог обработки одного диалога."""
+    dialog_id: int
+    name: str
+    deleted: int = 0
+    error: Optional[str] = None
+
+
+DialogWorker = Callable[[object], Awaitable[DialogResult]]
+
+
+async def run_dialog_workers(
+    dialogs: AsyncIterator,
+    worker: DialogWorker,
+    concurrency: int,
+    on_result: Optional[Callable[[DialogResult], None]] = None,
+    max_flood_retries: int = 3,
+) -> List[DialogResult]:
+    """
+    Обрабатывает диалоги параллельно, не более `concurrency` одновременно.
+    Диалоги берутся из потока по мере освобождения воркеров, поэтому
+    список диалогов не загружается в память целиком. FloodWait, пробившийся
+    из воркера, лимитер уже учёл (пауза полосы), поэтому диалог просто
+    повторяется — его запросы дождутся конца паузы в лимитере; после
+    max_flood_retries диалог отмечается ошибкой.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(dialog) -> DialogResult:
+        attempt = 0
+        while True:
+            try:
+                result = await worker(dialog)
+            except errors.FloodWaitError as e:
+                attempt += 1
+                if attempt <= max_flood_retries:
+                    continue
+                result = DialogResult(dialog.id, dialog.name, error=f"FloodWait {e.seconds} сек")
+            except Exception as e:
+                # Некоторые чаты могут быть недоступны, это не критично
+                result = DialogResult(dialog.id, dialog.name, error=str(e))
+            if on_result:
+                on_result(result)
+            return result
+
+    tasks: List[asyncio.Task] = []
+    try:
+        async for dialog in dialogs:
+            await semaphore.acquire()
+            task = asyncio.create_task(run_one(dialog))
+            task.add_done_callback(lambda _: semaphore.release())
+            tasks.append(task)
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from telethon import TelegramClient
+
+from .config_manager import get_config
+from .rate_limiter import get_rate_limiter
+
+log = logging.getLogger(__name__)
+
+# Столько сообщений отдаёт одна страница поиска по истории
+SEARCH_PAGE = 100
+
+
+@dataclass
+class DialogPlan:
+    """План по одному диалогу: сколько сообщений выше границы осталось пройти."""
+    dialog: object
+    boundaries: Dict[int, int]  # отправитель → граница (ID, выше которого ещё не чистили)
+    # Сообщения выше наименьшей границы: единственного отправителя или, если их
+    # несколько, всех участников (верхняя оценка — зато один запрос на диалог)
+    total: int = 0
+    counted: bool = True  # False — посчитать не удалось, диалог проходится целиком
+    server_side: bool = False  # История удаляется сервером целиком — считать незачем
+
+    @property
+    def exact(self) -> bool:
+        return len(self.boundaries) == 1
+
+
+@dataclass
+class PurgePlan:
+    """Диалоги к зачистке в порядке ожидаемой стоимости (сначала дешёвые)."""
+    dialogs: List[DialogPlan]
+    scanned: int = 0
+    empty: int = 0  # Диалоги, где удалять нечего — в зачистку не попадают
+    # (диалог, отправители), у которых по подсчёту удалять нечего: для них диалог уже чист
+    cleared: List[Tuple[object, List[int]]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._by_id = {plan.dialog.id: plan for plan in self.dialogs}
+
+    @property
+    def total(self) -> int:
+        return sum(p.total for p in self.dialogs)
+
+    def pending_for(self, dialog) -> Dict[int, int]:
+        """Отправители диалога, которых ещё нужно пройти: {user_id: граница}."""
+        plan = self._by_id.get(dialog.id)
+        return dict(plan.boundaries) if plan else {}
+
+    async def iter_dialogs(self) -> AsyncIterator:
+        for plan in self.dialogs:
+            yield plan.dialog
+
+    def estimate_rpc(self, chunk: int) -> int:
+        """Оценка числа запросов: страницы поиска плюс пачки удаления."""
+        rpc = 0
+        for plan in self.dialogs:
+            if plan.server_side:
+                rpc += len(plan.boundaries)
+                continue
+            pages = max(1, math.ceil(plan.total / SEARCH_PAGE))
+            # Нескольких отправителей ищем по одному или проходим историю целиком — что дешевле
+            rpc += pages if plan.exact else min(pages, len(plan.boundaries))
+            rpc += math.ceil(plan.total / chunk)
+        return rpc
+
+
+async def count_messages(client: TelegramClient, entity, sender_id: Optional[int], min_id: int) -> int:
+    """
+    Число сообщений выше min_id (только отправителя sender_id, если он задан) —
+    одним запросом с limit=0 (сервер отдаёт только total).
+    """
+    result = await get_rate_limiter(client).call(
+        lambda: client.get_messages(entity, limit=0, from_user=sender_id, min_id=min_id)
+    )
+    return result.total or 0
+
+
+async def plan_purge(
+    client: TelegramClient,
+    dialogs: AsyncIterator,
+    pending: Callable[[object], Dict[int, int]],
+    tag: str,
+    server_side: Optional[Callable[[object], bool]] = None,
+) -> PurgePlan:
+    """
+    Считает, сколько сообщений предстоит пройти в каждом диалоге, не листая
+    историю, — одним запросом на диалог: при одном отправителе считаются его
+    сообщения, при нескольких — все выше наименьшей границы (по отдельному
+    запросу на каждого стоило бы столько же, сколько сам поиск).
+    pending(dialog) возвращает {отправитель: граница} для ещё не пройденных пар.
+    Диалоги, для которых server_side(dialog) истинно, не считаются: их история
+    удаляется сервером за пару запросов, и они идут в начало очереди.
+    Диалоги без совпадений отбрасываются, остальные сортируются по возрастанию
+    объёма: мелкие чаты очищаются первыми, а крупные не задерживают остальные.
+    """
+    config = get_config()
+    semaphore = asyncio.Semaphore(max(1, config['PURGE_CONCURRENCY']))
+    log.info(f"[{tag}] 📋 Оцениваю объём зачистки (только счётчики, без выгрузки сообщений)...")
+
+    async def plan_one(dialog, boundaries: Dict[int, int]) -> DialogPlan:
+        plan = DialogPlan(dialog, boundaries)
+        if server_side and server_side(dialog):
+            plan.server_side = True
+            return plan
+        async with semaphore:
+            try:
+                sender_id = next(iter(boundaries)) if plan.exact else None
+                plan.total = await count_messages(client, dialog.entity, sender_id, min(boundaries.values()))
+            except Exception as e:
+                log.warning(f"[{tag}] ⚠️ '{dialog.name}': не удалось посчитать сообщения ({e}), диалог будет пройден целиком")
+                plan.counted = False
+        return plan
+
+    tasks = []
+    scanned = 0
+    async for dialog in dialogs:
+        scanned += 1
+        boundaries = pending(dialog)
+        if boundaries:
+            tasks.append(asyncio.create_task(plan_one(dialog, boundaries)))
+    plans = list(await asyncio.gather(*tasks))
+
+    useful = [p for p in plans if not p.counted or p.server_side or p.total]
+    # Непосчитанные — в конец: их стоимость неизвестна
+    useful.sort(key=lambda p: (not p.counted, p.total))
+    cleared = [(p.dialog, list(p.boundaries)) for p in plans if p.counted and not p.server_side and not p.total]
+    plan = PurgePlan(useful, scanned=scanned, empty=len(plans) - len(useful), cleared=cleared)
+    print_estimate(plan, get_rate_limiter(client).rate, tag)
+    return plan
+
+
+def print_estimate(plan: PurgePlan, rate: float, tag: str):
+    """Печатает оценку объёма и времени зачистки при темпе rate запр/с."""
+    config = get_config()
+    rpc = plan.estimate_rpc(config['DELETE_CHUNK'])
+    seconds = rpc / rate
+    uncounted = sum(1 for p in plan.dialogs if not p.counted)
+    server_side = sum(1 for p in plan.dialogs if p.server_side)
+    # В диалогах с несколькими отправителями посчитаны все сообщения — это верхняя граница
+    bound = "не больше " if any(p.counted and not p.server_side and not p.exact for p in plan.dialogs) else ""
+    log.info(f"[{tag}] 📋 Сообщений к удалению: {bound}{plan.total} в {len(plan.dialogs)} диал. "
+             f"(просмотрено {plan.scanned}, без совпадений пропущено {plan.empty}"
+             + (f", не посчитано {uncounted}" if uncounted else "")
+             + (f", удаляется сервером {server_side}" if server_side else "") + ")")
+    log.info(f"[{tag}] ⏱️ Оценка: ~{rpc} запросов, ~{seconds / 60:.1f} мин при текущем темпе "
+             f"{rate:.1f} запр/с (без учёта FloodWait)")
+    largest = sorted((p for p in plan.dialogs if p.counted), key=lambda p: p.total, reverse=True)[:3]
+    if largest:
+        log.info(f"[{tag}] 🐘 Крупнейшие: " + ", ".join(f"'{p.dialog.name}' ({p.total})" for p in largest))
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from telethon import errors
+
+from .accounts import account_label
+from .config_manager import get_config
+from .metrics import get_metrics
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Очереди (полосы) лимитера по убыванию приоритета: живые удаления и оповещения
+# обслуживаются раньше фоновой зачистки и сканирования
+LANE_LIVE = 0
+LANE_BULK = 1
+LANE_NAMES = ("live", "bulk")
+
+
+@dataclass
+class Lane:
+    """Полоса лимитера: свой адаптивный темп, свой запас токенов и своя пауза после FloodWait."""
+    rate: float
+    tokens: float
+    updated: float
+    resume_at: float = 0.0
+    success_streak: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+    def refill(self, now: float, burst: int):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд полоса сможет выдать токен."""
+        return max(self.resume_at - now, (1 - self.tokens) / self.rate, 0.0)
+
+
+class RateLimiter:
+    """
+    Адаптивный token bucket для всех запросов к API.
+    У каждой полосы свой темп: FloodWait ставит на паузу и замедляет только
+    ту полосу, в которой случился, — флуд фонового поиска не задерживает
+    живые удаления и оповещения. После серии успешных запросов темп полосы
+    понемногу поднимается обратно. Общий потолок аккаунта — max_rate.
+    Если токен готов в обеих полосах, сначала обслуживается LANE_LIVE;
+    чтобы фон не голодал, после live_streak токенов подряд живой полосе
+    (при ждущем фоне) следующий токен достаётся фоновой.
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, burst: int,
+                 increase_every: int = 50, increase_factor: float = 1.1, decrease_factor: float = 0.5,
+                 name: str = "default", live_streak: int = 8):
+        self.name = name
+        self.live_streak = live_streak
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_every = increase_every
+        self.increase_factor = increase_factor
+        self.decrease_factor = decrease_factor
+
+        now = time.monotonic()
+        self.lanes = [Lane(rate, float(burst), now) for _ in LANE_NAMES]
+        # Общий на аккаунт потолок: полосы вместе не превышают max_rate
+        self._account = Lane(max_rate, float(burst), now)
+        self.flood_count = 0
+        self.flood_seconds = 0
+        self._streak = 0  # Сколько токенов подряд ушло верхней полосе, пока нижняя ждала
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def rate(self) -> float:
+        """Темп фоновой полосы (по нему оцениваются длинные зачистки)."""
+        return self.lanes[LANE_BULK].rate
+
+    @property
+    def waiting(self) -> int:
+        """Сколько запросов сейчас ждут токен (во всех полосах)."""
+        return sum(self.lane_waiting(lane) for lane in range(len(self.lanes)))
+
+    def lane_waiting(self, lane: int) -> int:
+        return sum(1 for waiter in self.lanes[lane].waiters if not waiter.done())
+
+    async def acquire(self, lane: int = LANE_BULK):
+        """Ждёт свободный токен в своей полосе (и окончание FloodWait этой полосы, если он идёт)."""
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.lanes[lane].waiters.append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            # Раздача могла уснуть до конца паузы другой полосы — будим
+            self._wakeup.set()
+        try:
+            await waiter
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+        get_metrics().observe('tg_guard_rate_limit_wait_seconds', time.monotonic() - started,
+                              account=self.name, lane=LANE_NAMES[lane])
+
+    def _next_lane(self, ready: List[int]) -> int:
+        """Полоса, которой достанется токен (с защитой нижних полос от голодания)."""
+        if len(ready) > 1 and self._streak >= self.live_streak:
+            self._streak = 0
+            return ready[1]
+        self._streak = self._streak + 1 if len(ready) > 1 else 0
+        return ready[0]
+
+    async def _dispatch(self):
+        """Раздаёт токены ожидающим, пока они есть; FloodWait задерживает только свою полосу."""
+        while True:
+            now = time.monotonic()
+            self._account.refill(now, self.burst)
+            waiting: List[int] = []
+            ready: List[int] = []
+            for index, lane in enumerate(self.lanes):
+                while lane.waiters and lane.waiters[0].done():
+                    lane.waiters.popleft()  # Отменённые ожидания
+                if not lane.waiters:
+                    continue
+                waiting.append(index)
+                lane.refill(now, self.burst)
+                if lane.delay(now) == 0:
+                    ready.append(index)
+            if not waiting:
+                return
+            if not ready or self._account.tokens < 1:
+                delay = max(min(self.lanes[i].delay(now) for i in waiting), self._account.delay(now))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            lane = self.lanes[self._next_lane(ready)]
+            lane.tokens -= 1
+            self._account.tokens -= 1
+            lane.waiters.popleft().set_result(None)
+
+    def on_success(self, lane: int = LANE_BULK):
+        """Учитывает успешный запрос: после серии успехов полоса осторожно ускоряется."""
+        state = self.lanes[lane]
+        state.success_streak += 1
+        if state.success_streak >= self.increase_every:
+            state.success_streak = 0
+            state.rate = min(self.max_rate, state.rate * self.increase_factor)
+
+    def on_flood(self, seconds: int, lane: int = LANE_BULK):
+        """Учитывает FloodWait: пауза и снижение темпа полосы, в которой он пришёл."""
+        now = time.monotonic()
+        state = self.lanes[lane]
+        state.resume_at = max(state.resume_at, now + seconds + 1)
+        state.refill(now, self.burst)
+        state.tokens = 0
+        state.success_streak = 0
+        state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+        self.flood_count += 1
+        self.flood_seconds += seconds
+        metrics = get_metrics()
+        metrics.inc('tg_guard_flood_waits_total', account=self.name, lane=LANE_NAMES[lane])
+        metrics.inc('tg_guard_flood_wait_seconds_total', seconds, account=self.name, lane=LANE_NAMES[lane])
+        account = f" [{self.name}]" if self.name != "default" else ""
+        log.warning(f"[RATE]{account} ⏳ FloodWait {seconds} сек ({LANE_NAMES[lane]}). "
+                    f"Темп полосы снижен до {state.rate:.2f} запр/с")
+
+    async def call(self, rpc: Callable[[], Awaitable[T]], max_retries: int = 5, lane: int = LANE_BULK) -> T:
+        """Выполняет запрос через лимитер (в полосе lane), повторяя его после FloodWait."""
+        attempt = 0
+        while True:
+            await self.acquire(lane)
+            try:
+                result = await rpc()
+            except errors.FloodWaitError as e:
+                self.on_flood(e.seconds, lane)
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                continue
+            self.on_success(lane)
+            return result
+
+    async def iterate(self, request_iter: AsyncIterator[T], page_size: int = 100,
+                      lane: int = LANE_BULK) -> AsyncIterator[T]:
+        """
+        Оборачивает итератор Telethon (iter_messages, iter_dialogs, ...):
+        на каждую страницу из `page_size` элементов тратится один токен.
+        Итераторы Telethon после FloodWait можно продолжать, поэтому страница
+        просто запрашивается повторно.
+        """
+        iterator = request_iter.__aiter__()
+        count = 0
+        need_token = True
+        while True:
+            if need_token:
+                await self.acquire(lane)
+                need_token = False
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except errors.FloodWaitError as e:
+                self.on_flood(e.seconds, lane)
+                need_token = True
+                continue
+            count += 1
+            if count % page_size == 0:
+                self.on_success(lane)
+                need_token = True
+            yield item
+
+
+_rate_limiters: Dict[object, RateLimiter] = {}
+
+
+def get_rate_limiter(client=None) -> RateLimiter:
+    """
+    Лимитер аккаунта: все режимы одного аккаунта упираются в его лимиты,
+    а у разных аккаунтов FloodWait и темп независимы.
+    """
+    limiter = _rate_limiters.get(client)
+    if limiter is None:
+        config = get_config()
+        name = account_label(client) if client is not None else "default"
+        limiter = RateLimiter(
+            rate=config['RATE_LIMIT_INITIAL'],
+            min_rate=config['RATE_LIMIT_MIN'],
+            max_rate=config['RATE_LIMIT_MAX'],
+            burst=config['RATE_LIMIT_BURST'],
+            name=name,
+            live_streak=config['RATE_LIMIT_LIVE_STREAK'],
+        )
+        _rate_limiters[client] = limiter
+        metrics = get_metrics()
+        for lane, lane_name in enumerate(LANE_NAMES):
+            metrics.gauge('tg_guard_rate_limit_rps', "Текущий темп запросов лимитера по полосам",
+                          lambda lane=lane: limiter.lanes[lane].rate, account=name, lane=lane_name)
+            metrics.gauge('tg_guard_rate_limit_waiting', "Запросы, ждущие токен лимитера, по полосам",
+                          lambda lane=lane: limiter.lane_waiting(lane), account=name, lane=lane_name)
+    return limiter
@@ -1,68 +1,179 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
 from telethon import TelegramClient
 from telethon.utils import get_display_name
 
+from .accounts import account_label, account_of, register_account
 from .config_manager import get_config
+from .list_store import load_lists
 from .ui_manager import show_list_management_menu, show_mode_selection
-from .utils import resolve_users
+from .live_lists import get_live_lists, start_list_reloader
 from .message_handler import setup_saved_messages_auto_delete
+from .metrics import MeteredTelegramClient, start_metrics_exporter
 from .modes import (
-    mode_tracked_scanning, mode_blacklist_purge_all, 
-    mode_blacklist_new_only, mode_combined, mode_self_purge, get_users_from_group
+    mode_tracked_scanning, mode_blacklist_purge_all, mode_blacklist_new_only,
+    mode_combined, mode_self_purge, get_users_from_group, register_mode_handlers,
+    confirm_self_purge, plan_path
 )
 
+log = logging.getLogger(__name__)
+
+
+# Режимы, которым нужен список TRACKED (только для них выгружается EXPORT_GROUP)
+TRACKED_MODES = (1, 4)
+
 
-async def run_telegram_client():
-    """Основная функция для запуска Telegram клиента."""
-    print("🚀 Запускаю Telegram-клиент...")
-    
-    # Показываем меню настройки списков
-    print("\n" + "="*60)
-    print("🤖 TG-Guard - Настройка и запуск")
-    print("="*60)
-    
-    # Настройка списков
-    tracked_list, blacklist_list, exclusion_list = show_list_management_menu()
-    
-    # Показываем меню выбора режима
-    selected_mode = show_mode_selection()
-    
+async def run_telegram_client(headless: bool = False, mode: Optional[int] = None,
+                              lists_override: Optional[Tuple[List[str], List[str], List[str]]] = None):
+    """
+    Основная функция для запуска Telegram клиента.
+    headless=True — без меню: режим берётся из mode (или HEADLESS_MODE),
+    списки — из lists_override или из хранилища; клиент сразу начинает
+    слушать события, а начальная зачистка/сканирование идёт в фоне.
+    Если в SESSIONS перечислено несколько сессий, все аккаунты работают в
+    одном процессе: кэш, списки и метрики общие, лимит запросов у каждого свой.
+    """
+    log.info("🚀 Запускаю Telegram-клиент...")
     config = get_config()
-    async with TelegramClient(config['SESSION'], config['API_ID'], config['API_HASH']) as client:
-        me = await client.get_me()
-        me_id = me.id
-        print(f"✅ Вход выполнен как: {get_display_name(me)}")
 
-        # 1) Формируем итоговый набор отслеживаемых (TRACKED + EXPORT_GROUP)
-        tracked_users_set = set(tracked_list)  # Используем настроенный список
+    if headless:
+        selected_mode = mode or config['HEADLESS_MODE']
+        tracked_list, blacklist_list, exclusion_list = lists_override or load_lists()
+        log.info(f"🤖 TG-Guard - режим без меню, выбран режим {selected_mode}")
+    else:
+        # Показываем меню настройки списков
+        print("\n" + "="*60)
+        print("🤖 TG-Guard - Настройка и запуск")
+        print("="*60)
+
+        # Настройка списков
+        tracked_list, blacklist_list, exclusion_list = show_list_management_menu()
+
+        # Показываем меню выбора режима
+        selected_mode = show_mode_selection()
+
+    await start_metrics_exporter()
+    clients: List[TelegramClient] = []
+    try:
+        # Входим по очереди: при интерактивном входе коды запрашиваются для каждой сессии отдельно
+        for session in config['SESSIONS']:
+            # Вход и get_me идут до лимитера (он заводится после регистрации аккаунта),
+            # поэтому короткие FloodWait на этом этапе Telethon пережидает сам
+            client = MeteredTelegramClient(session, config['API_ID'], config['API_HASH'],
+                                           flood_sleep_threshold=config['SIGN_IN_FLOOD_SLEEP'])
+            clients.append(client)
+            await _sign_in(client, session, headless)
+            # Регистрация до первого обращения к лимитеру: по ней лимитеры и кэши разделяются по аккаунтам
+            me = await client.get_me()
+            register_account(client, session, me.id, get_display_name(me))
+            # Дальше Telethon не спит на FloodWait сам, а отдаёт его адаптивному лимитеру
+            client.flood_sleep_threshold = 0
+            log.info(f"✅ Вход выполнен как: {get_display_name(me)} (сессия {session})")
+
+        running = clients
+        if selected_mode == 5 and not headless and not config['PLAN_FILE_OUT']:
+            # Спрашиваем по очереди до запуска аккаунтов и вне цикла событий:
+            # input() внутри gather остановил бы работу остальных аккаунтов
+            plan_in = config['PLAN_FILE_IN']
+            running = [client for client in clients if await asyncio.to_thread(
+                confirm_self_purge, exclusion_list, plan_path(client, plan_in) if plan_in else "", account_label(client)
+            )]
+
+        # ID из прошлых запусков — чтобы обработчики работали ещё до резолва списков
+        get_live_lists().prime(tracked_list, blacklist_list, exclusion_list)
+        await asyncio.gather(*(
+            _run_mode(client, selected_mode, tracked_list, blacklist_list, exclusion_list, headless)
+            for client in running
+        ))
+    finally:
+        for client in clients:
+            await client.disconnect()
+
+
+async def _sign_in(client: TelegramClient, session: str, headless: bool):
+    if headless:
+        # Без терминала войти по коду нельзя — лучше сразу упасть, чем повиснуть на вводе телефона
+        await client.connect()
+        if not await client.is_user_authorized():
+            log.error(f"❌ Сессия {session} не авторизована. Запустите TG-Guard один раз интерактивно, чтобы войти.")
+            raise SystemExit(1)
+    else:
+        await client.start()
+
+
+async def _run_mode(client: TelegramClient, selected_mode: int, tracked_list: List[str],
+                    blacklist_list: List[str], exclusion_list: List[str], headless: bool):
+    config = get_config()
+    me_id = account_of(client).me_id
+    plan_phase = selected_mode == 2 and bool(config['PLAN_FILE_OUT'] or config['PLAN_FILE_IN'])
+    # Самоочистка и фаза двухфазной зачистки — разовые запуски, события не слушаем
+    listening = selected_mode != 5 and not plan_phase
+
+    # 1) Все обработчики — до первого await: события ловятся с момента входа,
+    #    а не после выгрузки EXPORT_GROUP, резолва списков и начального прохода
+    setup_saved_messages_auto_delete(client, me_id)
+    if listening:
+        register_mode_handlers(client, selected_mode)
+
+    # 2) Загрузка списков и начальный проход (по контрольным точкам — только недоделанное)
+    start = _start_mode(client, selected_mode, tracked_list, blacklist_list, exclusion_list, plan_phase)
+    if headless and listening:
+        task = asyncio.create_task(start)
+        task.add_done_callback(_report_background_failure)
+    else:
+        await start
+    if not listening:
+        return
+
+    log.info("✅ Скрипт запущен и слушает события...")
+    log.info("💡 Для остановки нажмите Ctrl+C")
+    await client.run_until_disconnected()
+
+
+async def _start_mode(client: TelegramClient, selected_mode: int, tracked_list: List[str],
+                      blacklist_list: List[str], exclusion_list: List[str], plan_phase: bool):
+    config = get_config()
+
+    # Выгружаем участников EXPORT_GROUP сразу с ID (их не нужно резолвить повторно)
+    exported_users = {}
+    if selected_mode in TRACKED_MODES:
         exported_users = await get_users_from_group(client, config['EXPORT_GROUP'])
-        tracked_users_set.update(exported_users)
-
-        # 2) Резолвим юзернеймы в ID
-        tracked_map = await resolve_users(client, tracked_users_set)
-        blacklist_map = await resolve_users(client, blacklist_list)  # Используем настроенный список
-        exclusion_map = await resolve_users(client, exclusion_list)  # Резолвим список исключений
-
-        print("\n--- Итоговые списки ---")
-        print(f"👀 Отслеживаем ({len(tracked_map)}): {list(tracked_map.values())}")
-        print(f"🚫 Чёрный список ({len(blacklist_map)}): {list(blacklist_map.values())}")
-        print(f"🔒 Исключения ({len(exclusion_map)}): {list(exclusion_map.values())}\n")
-
-        # 3) Регистрация обработчиков автоудаления в 'Избранном' (если включено)
-        setup_saved_messages_auto_delete(client, me_id)
-
-        # 4) Запускаем выбранный режим
-        if selected_mode == 1:
-            await mode_tracked_scanning(client, tracked_map)
-        elif selected_mode == 2:
-            await mode_blacklist_purge_all(client, blacklist_map)
-        elif selected_mode == 3:
-            await mode_blacklist_new_only(client, blacklist_map)
-        elif selected_mode == 4:
-            await mode_combined(client, tracked_map, blacklist_map)
-        elif selected_mode == 5:
-            await mode_self_purge(client, me_id, exclusion_map)
-            return  # Выходим после самоочистки, не слушаем события
-
-        print("\n✅ Скрипт запущен и слушает события...")
-        print("💡 Для остановки нажмите Ctrl+C")
-        await client.run_until_disconnected()
+
+    # Резолвим юзернеймы в ID (живые списки: их можно перезагрузить без перезапуска)
+    lists = get_live_lists()
+    tracked_map, blacklist_map, exclusion_map = await lists.load(
+        client, tracked_list, blacklist_list, exclusion_list, extra_tracked=exported_users
+    )
+    start_list_reloader(client)
+
+    log.info("--- Итоговые списки ---")
+    log.info(f"👀 Отслеживаем ({len(tracked_map)}): {list(tracked_map.values())}")
+    log.info(f"🚫 Чёрный список ({len(blacklist_map)}): {list(blacklist_map.values())}")
+    log.info(f"🔒 Исключения ({len(exclusion_map)}): {list(exclusion_map.values())}")
+
+    if selected_mode == 5:
+        # Подтверждение уже получено: без меню — флагом --yes (его проверяет main.py), иначе — до запуска аккаунтов
+        await mode_self_purge(client, account_of(client).me_id, exclusion_map, confirmed=True)
+        return
+    if plan_phase:
+        await mode_blacklist_purge_all(client, blacklist_map, plan_phase=True)
+        return
+    if config['PLAN_FILE_OUT'] or config['PLAN_FILE_IN']:
+        log.warning(f"⚠️ Файлы плана (--plan-out/--plan-in) используются только в режимах 2 и 5, "
+                    f"в режиме {selected_mode} они не учитываются")
+
+    if selected_mode == 1:
+        await mode_tracked_scanning(client, tracked_map)
+    elif selected_mode == 2:
+        await mode_blacklist_purge_all(client, blacklist_map)
+    elif selected_mode == 3:
+        await mode_blacklist_new_only(client, blacklist_map)
+    else:
+        await mode_combined(client, tracked_map, blacklist_map)
+
+
+def _report_background_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        log.error(f"❌ Ошибка начального прохода: {task.exception()}")
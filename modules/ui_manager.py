@@ -1,5 +1,5 @@
 from typing import List, Tuple
-from .config_manager import save_config_to_file
+from .list_store import load_lists, save_lists
 from .ui_enhanced import (
     Colors, print_header, print_section, print_box, print_menu_option,
     print_list_items, print_status, get_input_with_prompt, print_separator,
@@ -11,11 +11,8 @@ def show_list_management_menu() -> Tuple[List[str], List[str], List[str]]:
     """Показывает меню управления списками и возвращает обновленные списки."""
     print_header("⚙️ TG-Guard - Настройка списков", "Управление TRACKED, BLACKLIST и EXCLUSION")
     
-    # Копируем списки из конфигурации
-    from config import TRACKED, BLACKLIST, EXCLUSION_LIST
-    current_tracked = list(TRACKED)
-    current_blacklist = list(BLACKLIST)
-    current_exclusion = list(EXCLUSION_LIST)
+    # Загружаем сохранённые списки (при первом запуске они переносятся из config.py)
+    current_tracked, current_blacklist, current_exclusion = load_lists()
     
     while True:
         # Показываем текущие списки
@@ -29,9 +26,9 @@ def show_list_management_menu() -> Tuple[List[str], List[str], List[str]]:
         print_menu_option(1, "✏️", "Редактировать TRACKED", "список отслеживаемых")
         print_menu_option(2, "✏️", "Редактировать BLACKLIST", "чёрный список")
         print_menu_option(3, "🔒", "Редактировать EXCLUSION", "исключения для самоочистки", Colors.BRIGHT_CYAN)
-        print_menu_option(4, "🔄", "Сбросить к config.py", "восстановить настройки", Colors.BRIGHT_YELLOW)
+        print_menu_option(4, "🔄", "Отменить изменения", "вернуть сохранённые списки", Colors.BRIGHT_YELLOW)
         print_menu_option(5, "✅", "Продолжить", "с текущими настройками", Colors.BRIGHT_GREEN)
-        print_menu_option(6, "💾", "Сохранить в config.py", "записать изменения", Colors.BRIGHT_MAGENTA)
+        print_menu_option(6, "💾", "Сохранить", "записать изменения", Colors.BRIGHT_MAGENTA)
         
         try:
             choice = get_input_with_prompt("Выберите действие (1-6):", "choice")
@@ -43,15 +40,12 @@ def show_list_management_menu() -> Tuple[List[str], List[str], List[str]]:
             elif choice == "3":
                 current_exclusion = edit_exclusion_list(current_exclusion)
             elif choice == "4":
-                from config import TRACKED, BLACKLIST, EXCLUSION_LIST
-                current_tracked = list(TRACKED)
-                current_blacklist = list(BLACKLIST)
-                current_exclusion = list(EXCLUSION_LIST)
-                print_status("Списки сброшены к настройкам из config.py", "success")
+                current_tracked, current_blacklist, current_exclusion = load_lists()
+                print_status("Списки сброшены к сохранённым", "success")
             elif choice == "5":
                 return current_tracked, current_blacklist, current_exclusion
             elif choice == "6":
-                save_config_to_file(current_tracked, current_blacklist, current_exclusion)
+                save_lists(current_tracked, current_blacklist, current_exclusion)
                 return current_tracked, current_blacklist, current_exclusion
             else:
                 print_status("Неверный выбор. Пожалуйста, введите число от 1 до 6", "error")
@@ -1,6 +1,9 @@
-from typing import Iterable, Dict
+import asyncio
+import logging
+from typing import Iterable, Dict, Tuple
 from telethon.tl.types import Channel, Chat, User
-from telethon.utils import get_display_name
+
+log = logging.getLogger(__name__)
 
 
 def is_broadcast_channel(entity) -> bool:
@@ -13,6 +16,16 @@ def is_supergroup(entity) -> bool:
     return isinstance(entity, Channel) and getattr(entity, 'megagroup', False)
 
 
+def can_delete_participant_history(entity) -> bool:
+    """Супергруппа, где мы создатель или админ с правом удалять чужие сообщения."""
+    if not is_supergroup(entity):
+        return False
+    if getattr(entity, 'creator', False):
+        return True
+    rights = getattr(entity, 'admin_rights', None)
+    return bool(rights and rights.delete_messages)
+
+
 def is_basic_group(entity) -> bool:
     """Обычная (старая) группа."""
     return isinstance(entity, Chat)
@@ -33,16 +46,62 @@ def normalize_username(x: str) -> str:
     return x[1:] if isinstance(x, str) and x.startswith("@") else x
 
 
-async def resolve_users(client, ids_or_usernames: Iterable) -> Dict[int, str]:
-    """Превращает список юзернеймов/ID в словарь {user_id: display_name}."""
-    resolved: Dict[int, str] = {}
+async def resolve_user_entries(client, ids_or_usernames: Iterable) -> Dict[str, Tuple[int, str]]:
+    """
+    Резолвит юзернеймы/ID и возвращает {ключ записи: (user_id, display_name)},
+    где ключ — нормализованная запись списка (см. entity_cache.cache_key).
+    Сначала смотрит в дисковый кэш; промахи резолвятся параллельно
+    (не больше RESOLVE_CONCURRENCY запросов одновременно) и попадают в кэш.
+    """
+    from .accounts import account_id
+    from .config_manager import get_config
+    from .entity_cache import cache_key, display_name, get_entity_cache
+    from .rate_limiter import get_rate_limiter
+
+    cache = get_entity_cache()
+    limiter = get_rate_limiter(client)
+    account = account_id(client)
+    resolved: Dict[str, Tuple[int, str]] = {}
+    hits = []
+    misses = {}  # ключ кэша → исходная запись (дубликаты вроде '@Name'/'name' резолвим один раз)
     for item in ids_or_usernames:
-        try:
-            entity = await client.get_entity(normalize_username(item))
-            if isinstance(entity, User):
-                resolved[entity.id] = get_display_name(entity) or (entity.username or str(entity.id))
-        except Exception as e:
-            print(f"[WARN] Не удалось определить пользователя '{item}': {e}")
+        if not item:
+            continue
+        key = cache_key(item)
+        cached = cache.get(item, account)
+        if cached:
+            hits.append(cached)
+            resolved[key] = (cached.user_id, cached.name)
+        else:
+            misses.setdefault(key, item)
+    cache.prime_session(client, hits)
+
+    semaphore = asyncio.Semaphore(get_config()['RESOLVE_CONCURRENCY'])
+
+    async def resolve_one(key, item):
+        async with semaphore:
+            try:
+                entity = await limiter.call(lambda: client.get_entity(normalize_username(item)))
+            except Exception as e:
+                stale = cache.get(item, account, allow_stale=True)
+                if stale:
+                    # Лучше устаревшая запись, чем потерянный пользователь
+                    cache.prime_session(client, [stale])
+                    resolved[key] = (stale.user_id, stale.name)
+                    return
+                log.warning(f"[WARN] Не удалось определить пользователя '{item}': {e}")
+                return
+        if isinstance(entity, User):
+            found[item] = entity
+            resolved[key] = (entity.id, display_name(entity))
+
+    found: Dict[object, User] = {}
+    await asyncio.gather(*(resolve_one(key, item) for key, item in misses.items()))
+    if found:
+        # Промахи — в кэш одной транзакцией
+        cache.put_many(found.values(), account, queries={item: entity.id for item, entity in found.items()})
+    if misses:
+        log.info(f"[RESOLVE] 🔎 Из кэша: {len(hits)}, запрошено у сервера: {len(misses)}")
     return resolved
 
 
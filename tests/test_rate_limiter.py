@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config_manager проверяет .env при импорте
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'test')
+os.environ.setdefault('SESSION', 'test')
+
+from modules.rate_limiter import LANE_BULK, LANE_LIVE, RateLimiter  # noqa: E402
+
+
+def make_limiter(**kwargs) -> RateLimiter:
+    params = dict(rate=100, min_rate=1, max_rate=100, burst=1, live_streak=3)
+    params.update(kwargs)
+    return RateLimiter(**params)
+
+
+class RateLimiterLanesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_bulk_flood_does_not_stall_live_lane(self):
+        limiter = make_limiter()
+        limiter.on_flood(2, LANE_BULK)
+        bulk = asyncio.create_task(limiter.acquire(LANE_BULK))
+        await asyncio.sleep(0.05)
+        self.assertEqual(limiter.lane_waiting(LANE_BULK), 1)
+
+        started = time.monotonic()
+        await asyncio.wait_for(limiter.acquire(LANE_LIVE), timeout=0.5)
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertFalse(bulk.done())
+        bulk.cancel()
+
+    async def test_flood_slows_only_its_lane(self):
+        limiter = make_limiter()
+        limiter.on_flood(1, LANE_BULK)
+        self.assertEqual(limiter.lanes[LANE_BULK].rate, 50)
+        self.assertEqual(limiter.lanes[LANE_LIVE].rate, 100)
+        self.assertEqual(limiter.flood_count, 1)
+
+    async def test_live_flood_pauses_live_lane(self):
+        limiter = make_limiter()
+        limiter.on_flood(0, LANE_LIVE)
+        started = time.monotonic()
+        await limiter.acquire(LANE_LIVE)
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+
+    async def test_live_first_without_starving_bulk(self):
+        limiter = make_limiter(rate=50, max_rate=50, burst=1, live_streak=3)
+        order = []
+
+        async def request(lane, tag):
+            await limiter.acquire(lane)
+            order.append(tag)
+
+        bulk = [asyncio.create_task(request(LANE_BULK, f"b{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        live = [asyncio.create_task(request(LANE_LIVE, f"L{i}")) for i in range(6)]
+        await asyncio.gather(*bulk, *live)
+        live_order = [tag for tag in order if tag.startswith("L")]
+        self.assertEqual(live_order, [f"L{i}" for i in range(6)])
+        # После live_streak живых токенов подряд один достаётся фону
+        first_live = order.index("L0")
+        self.assertTrue(any(tag.startswith("b") for tag in order[first_live:first_live + 4]))
+
+
+if __name__ == "__main__":
+    unittest.main()